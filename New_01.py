@@ -1,5 +1,7 @@
 # app.py
 import streamlit as st
+from game_state import GameState
+from game_records import record_once
 
 st.set_page_config(page_title="Tic-Tac-Toe", page_icon="❎", layout="centered")
 
@@ -76,44 +78,28 @@ button[aria-label="X★"], button[aria-label="O★"] {
 </style>
 """, unsafe_allow_html=True)
 
-# ---------- GAME LOGIC ----------
-def init_board():
-    return [[None]*3 for _ in range(3)]
+# ---------- SESSION STATE ----------
+if "game" not in st.session_state:
+    st.session_state.game = GameState(3, 3)
 
-def check_winner(board):
-    # rows
-    for r in range(3):
-        if board[r][0] and board[r][0] == board[r][1] == board[r][2]:
-            return board[r][0], [(r,0),(r,1),(r,2)]
-    # columns
-    for c in range(3):
-        if board[0][c] and board[0][c] == board[1][c] == board[2][c]:
-            return board[0][c], [(0,c),(1,c),(2,c)]
-    # diagonals
-    if board[0][0] and board[0][0] == board[1][1] == board[2][2]:
-        return board[0][0], [(0,0),(1,1),(2,2)]
-    if board[0][2] and board[0][2] == board[1][1] == board[2][0]:
-        return board[0][2], [(0,2),(1,1),(2,0)]
-
-    # draw check
-    if all(board[r][c] is not None for r in range(3) for c in range(3)):
-        return "Draw", []
-
-    return None, []
+# partial reruns: a click inside the board only re-renders the board (Streamlit >= 1.37)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
 
-# ---------- SESSION STATE ----------
-if "board" not in st.session_state:
-    st.session_state.board = init_board()
-if "turn" not in st.session_state:
-    st.session_state.turn = "X"
-if "game_over" not in st.session_state:
-    st.session_state.game_over = False
-if "winner" not in st.session_state:
-    st.session_state.winner = None
-if "winning_cells" not in st.session_state:
-    st.session_state.winning_cells = []
-if "history" not in st.session_state:
-    st.session_state.history = []
+# ---------- CALLBACKS ----------
+# callbacks run before the rerun, so every move renders exactly once
+def on_cell(r, c):
+    st.session_state.game.play(r, c)
+    record_once(st.session_state, st.session_state.game)
+
+def on_undo():
+    if not st.session_state.game.over:
+        st.session_state.game.undo()
+
+def on_new_game():
+    st.session_state.game = GameState(3, 3)
+
+def on_reset():
+    st.session_state.pop("game", None)
 
 # ---------- TITLE ----------
 st.markdown("<h1>Tic-Tac-Toe</h1>", unsafe_allow_html=True)
@@ -121,76 +107,50 @@ st.markdown("<h1>Tic-Tac-Toe</h1>", unsafe_allow_html=True)
 # ---------- CONTROLS ----------
 colA, colB, colC = st.columns(3)
 with colA:
-    if st.button("Undo", key="undo"):
-        if st.session_state.history and not st.session_state.game_over:
-            last = st.session_state.history.pop()
-            _, r, c = last
-            st.session_state.board[r][c] = None
-            st.session_state.turn = "O" if st.session_state.turn == "X" else "X"
+    st.button("Undo", key="undo", on_click=on_undo)
 
 with colB:
-    if st.button("New Game", key="new"):
-        st.session_state.board = init_board()
-        st.session_state.turn = "X"
-        st.session_state.history = []
-        st.session_state.game_over = False
-        st.session_state.winner = None
-        st.session_state.winning_cells = []
+    st.button("New Game", key="new", on_click=on_new_game)
 
 with colC:
-    if st.button("Reset"):
-        for key in ["board","turn","history","game_over","winner","winning_cells"]:
-            st.session_state.pop(key, None)
-        st.experimental_rerun()
-
-# ---------- TURN DISPLAY ----------
-st.markdown(
-    f"<h3 style='color:white;'>Turn: {'❌ X' if st.session_state.turn=='X' else '⭕ O'}</h3>",
-    unsafe_allow_html=True
-)
-
-# ---------- BOARD UI ----------
-filled = sum(1 for r in st.session_state.board for c in r if c is not None)
-rows = [st.columns([1,1,1]) for _ in range(3)]
-
-for r in range(3):
-    for c in range(3):
-        val = st.session_state.board[r][c]
-
-        if val is None:
-            label = " "
-            aria = f"cell_{r}_{c}"
-        else:
-            if (r,c) in st.session_state.winning_cells:
+    st.button("Reset", key="reset", on_click=on_reset)
+
+@fragment
+def board_view():
+    game = st.session_state.game
+
+    # ---------- TURN DISPLAY ----------
+    st.markdown(
+        f"<h3 style='color:white;'>Turn: {'❌ X' if game.turn_name=='X' else '⭕ O'}</h3>",
+        unsafe_allow_html=True
+    )
+
+    # ---------- BOARD UI ----------
+    winning_cells = game.winning_cells
+    rows = [st.columns([1,1,1]) for _ in range(3)]
+
+    for r in range(3):
+        for c in range(3):
+            val = game.cell(r, c)
+
+            if val is None:
+                label = " "
+            elif (r,c) in winning_cells:
                 label = f"{val}★"
-                aria = label
             else:
                 label = val
-                aria = val
-
-        key = f"{r}{c}_{filled}"
-
-        if rows[r][c].button(label, key=key):
-            if not st.session_state.game_over and st.session_state.board[r][c] is None:
-                st.session_state.board[r][c] = st.session_state.turn
-                st.session_state.history.append((st.session_state.turn,r,c))
-
-                winner, cells = check_winner(st.session_state.board)
-                if winner:
-                    st.session_state.game_over = True
-                    st.session_state.winner = winner
-                    st.session_state.winning_cells = cells
-                else:
-                    st.session_state.turn = "O" if st.session_state.turn=="X" else "X"
-
-                st.experimental_rerun()
-
-# ---------- STATUS ----------
-st.write("")
-if st.session_state.game_over:
-    if st.session_state.winner == "Draw":
-        st.info("It's a Draw!")
+
+            # stable key: the same widget is updated in place from move to move
+            rows[r][c].button(label, key=f"cell_{r}_{c}", on_click=on_cell, args=(r, c))
+
+    # ---------- STATUS ----------
+    st.write("")
+    if game.over:
+        if not game.winner:
+            st.info("It's a Draw!")
+        else:
+            st.success(f"Winner: {game.winner_name}")
     else:
-        st.success(f"Winner: {st.session_state.winner}")
-else:
-    st.info("Game in progress...")
+        st.info("Game in progress...")
+
+board_view()
@@ -0,0 +1,361 @@
+# ai_worker.py
+# Background AI search for tic.py: runs the minimax of tic_engine on a worker
+# thread with iterative deepening, so the page stays responsive, progress can be
+# shown while it thinks, and the search can be cancelled. A Ponderer searches the
+# AI's answers to the most likely human replies while the human is thinking.
+# Large boards (threat_engine.uses_threat_search) get a threat-space search
+# instead, under the same job protocol.
+#
+# An AnalysisJob runs the analysis heatmap's search (tic_engine.Analysis) the
+# same way. Searches somebody waits for (AI moves, analyses) run on one small
+# thread pool shared by every session of the server (SEARCH_WORKERS threads).
+# Pondering runs on a thread of its own and only while that pool is idle: a
+# search submitted to the pool stops all pondering queued or running at the
+# time (see Demand), so guesswork never delays a reply. Each job's cancel flag
+# is a Budget: besides cancel() it trips when the session has not polled the job
+# for IDLE_SECONDS, so a closed tab stops costing CPU within seconds. A pondered
+# job also stops at its deadline (PONDER_SECONDS per reply) or when it gives way
+# to the pool; that only stops it: the depths it completed are kept, and a
+# ponder hit carries on from the next depth.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from game_state import GameState, SearchState
+from tic_engine import (SearchCancelled, WIN_SCORE, Analysis, minimax, minimax_profiled, heuristic, other,
+                        position_rng)
+from threat_engine import choose_threat_move, move_scores, uses_threat_search
+
+SEARCH_WORKERS = max(2, min(4, os.cpu_count() or 1))
+PONDER_SECONDS = 3.0   # search time per pondered reply
+IDLE_SECONDS = 10.0    # a job nobody polled for this long is abandoned
+
+_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="tic-search")
+_ponder_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tic-ponder")
+
+class Demand:
+    """Searches somebody waits for: how many are queued or running on the pool,
+    and an epoch that counts their submissions. Pondering started at one epoch
+    gives way as soon as the epoch moves on."""
+
+    def __init__(self):
+        self._idle = threading.Condition()
+        self.active = 0
+        self.epoch = 0
+
+    def submit(self, fn):
+        with self._idle:
+            self.active += 1
+            self.epoch += 1
+        _pool.submit(self._run, fn)
+
+    def _run(self, fn):
+        try:
+            fn()
+        finally:
+            with self._idle:
+                self.active -= 1
+                self._idle.notify_all()
+
+    def wait_idle(self, epoch:int, stop:threading.Event) -> bool:
+        # blocks until the pool has nothing to do; False once a search newer than
+        # `epoch` was submitted (or `stop` is set) meanwhile
+        with self._idle:
+            while self.active and self.epoch == epoch and not stop.is_set():
+                self._idle.wait(0.1)
+            return self.epoch == epoch and not stop.is_set()
+
+_demand = Demand()
+
+class Budget:
+    """Cancel flag of a job (the second counter item, see tic_engine.minimax):
+    set by cancel() or once nobody has touched it for `idle` seconds. A pondered
+    job's flag also trips, without cancelling it, at its deadline and when a
+    search somebody waits for arrives after `epoch`. The searches poll is_set()
+    every few hundred nodes."""
+    __slots__ = ("_cancel", "deadline", "epoch", "idle", "seen")
+
+    def __init__(self, idle:Optional[float]=None):
+        self._cancel = threading.Event()
+        self.deadline: Optional[float] = None   # perf_counter() time, or None
+        self.epoch: Optional[int] = None        # Demand epoch a pondered job runs at
+        self.idle = idle
+        self.seen = time.perf_counter()
+
+    def set(self):
+        self._cancel.set()
+
+    def touch(self):
+        self.seen = time.perf_counter()
+
+    def is_set(self) -> bool:
+        if self._cancel.is_set():
+            return True
+        now = time.perf_counter()
+        if self.idle is not None and now - self.seen > self.idle:
+            self._cancel.set()  # abandoned: for good
+            return True
+        if self.epoch is not None and self.epoch != _demand.epoch:
+            return True  # pondering gives way to a search somebody waits for
+        return self.deadline is not None and now > self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+class Job:
+    """A search on the worker pool: runs once, reports its node count, and can
+    be cancelled, polled (touch) and waited for."""
+
+    def __init__(self, key:bytes, idle:Optional[float]=None):
+        self.key = key                         # cells of the position searched
+        self.budget = Budget(idle)
+        self.counter = [0, self.budget]        # nodes, cancel flag (see tic_engine.minimax)
+        self.cancelled = False
+        self.elapsed = 0.0
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._claimed = False
+
+    def claim(self) -> bool:
+        # a job runs once, on whichever thread claims it first
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            return True
+
+    def run(self):
+        t0 = time.perf_counter()
+        while True:
+            try:
+                self._search()
+                stopped = False
+            except SearchCancelled:
+                stopped = True
+            with self._lock:
+                if stopped and not self.budget.cancelled and not self.budget.is_set():
+                    continue  # its deadline was lifted as it tripped (Ponderer.take): carry on
+                # a deadline or giving way only stops the search (see SearchJob.resume)
+                self.cancelled = stopped and self.budget.cancelled
+                self._finish()
+                self.elapsed = time.perf_counter() - t0
+                self._done.set()
+                return
+
+    def _search(self):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def start(self):
+        if self.claim():
+            _demand.submit(self.run)
+        return self
+
+    def cancel(self):
+        self.budget.set()
+
+    def touch(self):
+        # the session still wants this job (see Budget)
+        self.budget.touch()
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def nodes(self) -> int:
+        return self.counter[0]
+
+class SearchJob(Job):
+    """Iterative-deepening search of one position, on its own copy of the game."""
+
+    def __init__(self, game:GameState, depth:int, ai_p:int, rng=None, stats=None, idle:Optional[float]=None):
+        super().__init__(bytes(game.cells), idle)
+        self.game = SearchState.from_game(game)
+        self.depth = depth
+        self.ai_p = ai_p
+        self.rng = rng or position_rng(game)  # fallback move when the search has no preference
+        self.stats = stats                     # search_stats.SearchStats, or None (no profiling)
+        self.depth_reached = 0
+        self.best: Optional[int] = None        # best cell of the last completed depth
+        self.score: Optional[int] = None
+        self.move: Optional[Tuple[int,int]] = None
+
+    def _search(self):
+        if uses_threat_search(self.game):
+            self._threats()
+        else:
+            self._deepen()
+
+    def _finish(self):
+        if not self.cancelled:
+            best = self.best
+            if best is None and self.complete:
+                moves = self.game.free_cells()
+                best = self.rng.choice(moves) if moves else None
+            # a stopped search answers with its deepest completed depth, if any
+            self.move = None if best is None else divmod(best, self.game.size)
+
+    @property
+    def complete(self) -> bool:
+        # searched to full depth, or to a forced result
+        return self.depth_reached >= self.depth or (self.score is not None and abs(self.score) >= WIN_SCORE)
+
+    def resume(self) -> "SearchJob":
+        # a pondered search stopped before its full depth: lifts the deadline and
+        # carries on from the next depth on the pool (the earlier ones are kept)
+        self.budget.deadline = None
+        self.budget.epoch = None
+        self._done.clear()
+        self._claimed = False
+        return self.start()
+
+    def _deepen(self):
+        stats = self.stats
+        search = minimax if stats is None else partial(minimax_profiled, stats=stats)
+        # a stopped search leaves its moves on the board: search a copy, so the
+        # job's position stays intact for resume()
+        state = self.game.copy()
+        for d in range(self.depth_reached + 1, self.depth + 1):
+            t0 = time.perf_counter()
+            score, best = search(state, 0, d, True, self.ai_p, other(self.ai_p), self.counter)
+            self.best, self.score, self.depth_reached = best, score, d
+            if stats is not None:
+                stats.iteration(d, time.perf_counter() - t0)
+            if abs(score) >= WIN_SCORE:
+                break  # forced result, deeper iterations cannot change it
+
+    def _threats(self):
+        # one time-limited threat search; the depth setting does not apply
+        t0 = time.perf_counter()
+        move = choose_threat_move(self.game, self.ai_p, counter=self.counter)
+        if move is not None:
+            self.best = move[0]*self.game.size + move[1]
+        self.depth_reached = self.depth
+        if self.stats is not None:
+            # logged as depth 0: the search is bounded by threat_engine.TIME_LIMIT
+            self.stats.kind = "threats"
+            self.stats.depth = 0
+            self.stats.iteration(0, time.perf_counter() - t0, self.counter[0])
+
+    @property
+    def best_so_far(self) -> Optional[Tuple[int,int]]:
+        return None if self.best is None else divmod(self.best, self.game.size)
+
+class AnalysisJob(Job):
+    """Scores of every move of one position (tic_engine.Analysis.scores) on the
+    worker pool, reusing the session's Analysis and its table."""
+
+    def __init__(self, game:GameState, depth:int, engine:Analysis, stats=None, idle:Optional[float]=None):
+        super().__init__(bytes(game.cells), idle)
+        self.game = game.copy()
+        self.depth = depth
+        self.engine = engine
+        self.stats = stats
+        self.scores: Optional[Dict[int, int]] = None
+
+    def _search(self):
+        with self.engine.lock:
+            self.scores = self.engine.scores(self.game, self.depth, self.counter, self.stats)
+
+def likely_replies(game:GameState, count:int):
+    # human replies ranked by the evaluation they leave for the human
+    human_p = game.turn
+    ai_p = other(human_p)
+    state = SearchState.from_game(game)
+    if uses_threat_search(state):
+        scores = move_scores(state, human_p)  # near-stone cells only
+        return sorted(scores, key=lambda i: -scores[i])[:count]
+    scored = []
+    for i in state.free_cells():
+        state.push(i, human_p)
+        sc = 10**6 if state.winner else heuristic(state, human_p, ai_p)
+        state.pop(i)
+        scored.append((sc, i))
+    scored.sort(key=lambda t: -t[0])
+    return [i for _, i in scored[:count]]
+
+class Ponderer:
+    """Searches the AI's answer to each likely human reply, one after another,
+    for at most `seconds` each, while the pool has nothing else to do."""
+
+    def __init__(self, game:GameState, depth:int, ai_p:int, replies:int=3, rng=None, make_stats=None,
+                 seconds:float=PONDER_SECONDS, idle:Optional[float]=None):
+        self.key = bytes(game.cells)  # position the human is thinking about
+        self.jobs: Dict[bytes, SearchJob] = {}
+        self._order = []
+        self._stop = threading.Event()
+        for i in likely_replies(game, replies):
+            after = game.copy()
+            after.play(*divmod(i, game.size))
+            # skip replies that end the game or keep the turn (power cells)
+            if after.over or after.turn != ai_p:
+                continue
+            job = SearchJob(after, depth, ai_p, rng, make_stats and make_stats(), idle)
+            self.jobs[job.key] = job
+            self._order.append(job)
+        self.seconds = seconds
+        self.epoch = 0
+        self._taken: Optional[SearchJob] = None
+
+    def run(self):
+        for job in self._order:
+            # wait for an idle pool; any search submitted since start() ends it
+            if not _demand.wait_idle(self.epoch, self._stop):
+                break
+            with job._lock:
+                # the deadline only binds a job nobody has taken (see take)
+                if job is not self._taken:
+                    job.budget.deadline = time.perf_counter() + self.seconds
+                    job.budget.epoch = self.epoch
+            if job.claim():
+                job.run()
+
+    def start(self) -> "Ponderer":
+        self.epoch = _demand.epoch
+        _ponder_pool.submit(self.run)
+        return self
+
+    def take(self, game:GameState) -> Optional[SearchJob]:
+        # on a ponder hit, hands over the job for this position (finished or still
+        # running) and cancels the rest; on a miss, cancels everything
+        job = self.jobs.pop(bytes(game.cells), None)
+        self.cancel()
+        if job is None:
+            return None
+        with job._lock:
+            self._taken = job
+            job.budget.deadline = None  # the answer is needed now: search to full depth
+            job.budget.epoch = None
+            job.budget.touch()
+            done = job.done
+        if done and job.cancelled:
+            return None  # abandoned (idle): search afresh
+        if job.stats is not None:
+            job.stats.ponder_hit = True
+        if done and not job.complete:
+            return job.resume()  # stopped early: carry on from the next depth
+        # already running or finished on the ponder thread, otherwise started here
+        return job.start()
+
+    def touch(self):
+        for job in self.jobs.values():
+            job.touch()
+
+    def cancel(self):
+        self._stop.set()
+        for job in self.jobs.values():
+            job.cancel()
+
+    @property
+    def finished(self) -> int:
+        return sum(1 for job in self._order if job.done)
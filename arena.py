@@ -0,0 +1,207 @@
+# arena.py
+# Headless self-play arena for the tic.py AI engines.
+#
+# Plays engine-vs-engine games in parallel worker processes over a sweep of
+# (size, win_len, ai_depth, power cells, swap rule) configurations, streams one
+# CSV row per game to a results file and prints Elo estimates, average think
+# time and nodes per second per engine. With --record the games themselves are
+# appended to a binary record file (see game_records.py).
+#
+#   python arena.py --sizes 3,4 --depths 1,2,3 --games 200 --out arena.csv
+#   python arena.py --games 1000 --record arena.ttr
+#   python arena.py --summarize arena.csv
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from multiprocessing import Pool
+
+from game_state import GameState, SearchState, X, O
+from tic_engine import generate_power_cells, heuristic, choose_move
+from threat_engine import choose_threat_move, uses_threat_search
+from game_records import RecordWriter, record_of
+
+FIELDS = ["size", "win_len", "power", "swap", "depth_a", "depth_b", "seed", "result",
+          "plies", "swapped", "a_moves", "a_ms", "a_nodes", "b_moves", "b_ms", "b_nodes"]
+
+# -------------------------
+# Single game
+# -------------------------
+def play_game(task):
+    # engine A moves first as X; result is "A", "B" or "D" (draw). Returns the
+    # CSV row and the encoded game record
+    size, win_len, power, swap, depth_a, depth_b, seed, opening_plies, swap_after = task
+    rng = random.Random(seed)
+    power_cells = generate_power_cells(size, power) if power else []
+    game = GameState(size, win_len, power_cells, swap_after if swap else 0)
+    depth = {"A": depth_a, "B": depth_b}
+    moves = {"A": 0, "B": 0}
+    think = {"A": 0.0, "B": 0.0}
+    nodes = {"A": 0, "B": 0}
+    swap_decided = False
+    while not game.over:
+        # after a swap engine B owns the X stones
+        label = "AB"[(game.turn == O) != game.has_swapped]
+        if game.moves_made < opening_plies:
+            # random openings so that deterministic engines play distinct games
+            mv = divmod(rng.choice(game.free_cells()), size)
+        else:
+            counter = [0]
+            t0 = time.perf_counter()
+            if uses_threat_search(game):
+                mv = choose_threat_move(game, game.turn, counter=counter)
+            else:
+                mv = choose_move(game, depth[label], game.turn, rng, counter)
+            think[label] += time.perf_counter() - t0
+            nodes[label] += counter[0]
+            moves[label] += 1
+        game.play(*mv)
+        # swap rule: the engine playing second may take over X's position
+        if game.swap_available and not swap_decided:
+            swap_decided = True
+            if heuristic(SearchState.from_game(game), X, O) > 0:
+                game.swap()
+    if game.winner:
+        result = "AB"[(game.winner == O) != game.has_swapped]
+    else:
+        result = "D"
+    row = [size, win_len, power, int(swap), depth_a, depth_b, seed, result, game.filled,
+           int(game.has_swapped), moves["A"], round(think["A"] * 1000, 3), nodes["A"],
+           moves["B"], round(think["B"] * 1000, 3), nodes["B"]]
+    return row, record_of(game, ai=X | O).encode()
+
+# -------------------------
+# Sweep
+# -------------------------
+def configs(sizes, win_lens, powers, swaps):
+    for size in sizes:
+        for win_len in win_lens or range(3, size + 1):
+            if not 3 <= win_len <= size:
+                continue
+            for power in powers:
+                if power > size * size // 3:
+                    continue
+                for swap in swaps:
+                    yield size, win_len, power, swap
+
+def tasks(args):
+    # generated lazily so thousands of games never sit in memory at once
+    seed = args.seed
+    for size, win_len, power, swap in configs(args.sizes, args.win_lens, args.power, args.swap):
+        for depth_a, depth_b in itertools.permutations(args.depths, 2):
+            for _ in range(args.games):
+                seed += 1
+                yield (size, win_len, power, swap, depth_a, depth_b, seed,
+                       args.opening_plies, args.swap_after)
+
+# -------------------------
+# Summary
+# -------------------------
+def elo_ratings(points, games, iterations=200):
+    # Bradley-Terry fit (MM algorithm); one virtual draw per pairing keeps
+    # all-win / all-loss records finite. Mean rating is anchored at 0.
+    players = sorted({p for pair in games for p in pair})
+    pts = defaultdict(float)
+    n = defaultdict(int)
+    for (a, b), g in games.items():
+        pts[a, b] += points[a, b] + 0.5
+        n[a, b] += g + 1
+        n[b, a] += g + 1
+        pts[b, a] += g - points[a, b] + 0.5
+    gamma = {p: 1.0 for p in players}
+    for _ in range(iterations):
+        for p in players:
+            wins = sum(pts[p, q] for q in players if q != p)
+            denom = sum(n[p, q] / (gamma[p] + gamma[q]) for q in players if q != p and n[p, q])
+            if denom:
+                gamma[p] = wins / denom
+        mean = sum(math.log(g) for g in gamma.values()) / len(players)
+        gamma = {p: g / math.exp(mean) for p, g in gamma.items()}
+    return {p: 400 * math.log10(g) for p, g in gamma.items()}
+
+def summarize(path, out=sys.stdout):
+    # streams the results file, so it works on files of any size
+    points = defaultdict(lambda: defaultdict(float))
+    games = defaultdict(lambda: defaultdict(int))
+    think = defaultdict(lambda: [0, 0.0, 0])  # (config, depth) -> moves, ms, nodes
+    results = defaultdict(lambda: [0, 0, 0])  # config -> first-mover wins, second wins, draws
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            cfg = (int(row["size"]), int(row["win_len"]), int(row["power"]), int(row["swap"]))
+            da, db = int(row["depth_a"]), int(row["depth_b"])
+            score = {"A": 1.0, "B": 0.0, "D": 0.5}[row["result"]]
+            points[cfg][da, db] += score
+            games[cfg][da, db] += 1
+            results[cfg]["ABD".index(row["result"])] += 1
+            for side, d in (("a", da), ("b", db)):
+                acc = think[cfg, d]
+                acc[0] += int(row[side + "_moves"])
+                acc[1] += float(row[side + "_ms"])
+                acc[2] += int(row[side + "_nodes"])
+    for cfg in sorted(games):
+        size, win_len, power, swap = cfg
+        a, b, d = results[cfg]
+        out.write(f"\n{size}x{size} win={win_len} power={power} swap={swap}: "
+                  f"{a + b + d} games, first-mover {a} / second {b} / draws {d}\n")
+        out.write(f"  {'depth':>5} {'elo':>8} {'ms/move':>10} {'nodes/s':>12}\n")
+        elo = elo_ratings(points[cfg], games[cfg])
+        for depth in sorted(elo):
+            moves, ms, nodes = think[cfg, depth]
+            avg = ms / moves if moves else 0.0
+            nps = nodes / (ms / 1000) if ms else 0.0
+            out.write(f"  {depth:>5} {elo[depth]:>8.1f} {avg:>10.3f} {nps:>12.0f}\n")
+
+# -------------------------
+# CLI
+# -------------------------
+def int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless engine-vs-engine arena for tic.py")
+    ap.add_argument("--sizes", type=int_list, default=[3, 4])
+    ap.add_argument("--win-lens", type=int_list, default=[], help="default: every valid win length")
+    ap.add_argument("--depths", type=int_list, default=[1, 2, 3])
+    ap.add_argument("--power", type=int_list, default=[0, 1], help="power cell counts to sweep")
+    ap.add_argument("--swap", type=int_list, default=[0, 1], help="swap rule off/on")
+    ap.add_argument("--swap-after", type=int, default=1)
+    ap.add_argument("--games", type=int, default=20, help="games per ordered depth pairing")
+    ap.add_argument("--opening-plies", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--out", default="arena_results.csv")
+    ap.add_argument("--record", metavar="TTR", help="also append every game to this record file")
+    ap.add_argument("--summarize", metavar="CSV", help="only print the summary of an existing results file")
+    args = ap.parse_args(argv)
+
+    if args.summarize:
+        summarize(args.summarize)
+        return
+
+    t0 = time.perf_counter()
+    played = 0
+    with open(args.out, "w", newline="") as f, Pool(args.workers) as pool:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        records = RecordWriter(args.record) if args.record else None
+        for row, record in pool.imap_unordered(play_game, tasks(args), chunksize=8):
+            writer.writerow(row)
+            if records:
+                records.write(record)
+            played += 1
+            if played % 100 == 0:
+                f.flush()
+                print(f"\r{played} games", end="", file=sys.stderr)
+        if records:
+            records.close()
+    elapsed = time.perf_counter() - t0
+    print(f"\r{played} games in {elapsed:.1f}s -> {args.out}", file=sys.stderr)
+    summarize(args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_analysis.py
+# Cost of the tic.py analysis mode (every move scored, tic_engine.Analysis)
+# against finding the best move only, on seeded random positions:
+#
+#   minimax   the engine's plain minimax (what ai_move runs)
+#   best      alpha-beta + transposition table, best move only
+#   all       multi-PV: an exact score for every free cell, fresh table
+#   per-cell  the naive alternative: a best-move search after each candidate cell
+#   reused    multi-PV along a game, keeping the table between positions
+#
+#   python bench_analysis.py
+#   python bench_analysis.py --shapes 5x4 --depth 4 --positions 20
+import argparse
+import random
+import time
+
+from game_state import GameState, SearchState
+from tic_engine import Analysis, minimax, other
+
+def shape_list(text):
+    # "3x3,4x4" -> [(3, 3), (4, 4)]  (board size x win length)
+    return [tuple(int(v) for v in s.split("x")) for s in text.split(",") if s.strip()]
+
+def positions(size, win_len, count, seed):
+    # games of random moves; every position of each game until it is over
+    rng = random.Random(seed)
+    games = []
+    while sum(len(g) for g in games) < count:
+        game = GameState(size, win_len)
+        line = []
+        while not game.over and game.filled < size * size - 2:
+            line.append(game.copy())
+            game.play(*divmod(rng.choice(game.free_cells()), size))
+        games.append(line)
+    return games
+
+def per_cell(game, depth, counter):
+    for i in game.free_cells():
+        child = game.copy()
+        child.play(*divmod(i, game.size))
+        if not child.over:
+            Analysis().best_move(child, depth - 1, counter)
+
+def timed(fn):
+    counter = [0]
+    t0 = time.perf_counter()
+    fn(counter)
+    return counter[0], time.perf_counter() - t0
+
+def bench(size, win_len, depth, count, seed):
+    totals = {k: [0, 0.0] for k in ("minimax", "best", "all", "reused", "per-cell")}
+    for line in positions(size, win_len, count, seed):
+        reused = Analysis()
+        for game in line:
+            p = game.turn
+            runs = {
+                "minimax": lambda c: minimax(SearchState.from_game(game), 0, depth, True, p, other(p), c),
+                "best": lambda c: Analysis().best_move(game, depth, c),
+                "all": lambda c: Analysis().scores(game, depth, c),
+                "reused": lambda c: reused.scores(game, depth, c),
+                "per-cell": lambda c: per_cell(game, depth, c),
+            }
+            for name, fn in runs.items():
+                nodes, sec = timed(fn)
+                totals[name][0] += nodes
+                totals[name][1] += sec
+    return totals
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Multi-PV analysis vs best-move search")
+    ap.add_argument("--shapes", type=shape_list, default=[(3, 3), (4, 3), (4, 4), (5, 4)])
+    ap.add_argument("--depth", type=int, default=4)
+    ap.add_argument("--positions", type=int, default=30, help="positions per shape (at least)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    print(f"{'shape':<8} {'depth':>5} {'minimax ms':>11} {'best ms':>9} {'all ms':>9} {'reused ms':>10} "
+          f"{'per-cell ms':>12} {'all/best':>9} {'reused/best':>12} {'per-cell/best':>14}")
+    for size, win_len in args.shapes:
+        t = bench(size, win_len, args.depth, args.positions, args.seed)
+        ms = {k: v[1] * 1000 for k, v in t.items()}
+        print(f"{size}x{size}/{win_len:<4} {args.depth:>5} {ms['minimax']:>11.1f} {ms['best']:>9.1f} "
+              f"{ms['all']:>9.1f} {ms['reused']:>10.1f} {ms['per-cell']:>12.1f} {ms['all'] / ms['best']:>9.2f} "
+              f"{ms['reused'] / ms['best']:>12.2f} {ms['per-cell'] / ms['best']:>14.2f}")
+        print(f"{'':<8} {'nodes':>5} " + " ".join(f"{t[k][0]:>{w},}" for k, w in
+              (("minimax", 11), ("best", 9), ("all", 9), ("reused", 10), ("per-cell", 12))))
+
+if __name__ == "__main__":
+    main()
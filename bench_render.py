@@ -0,0 +1,119 @@
+# bench_render.py
+# Server-side render cost per move for the board apps, measured headlessly with
+# Streamlit's AppTest: CPU time of the script run(s) a cell click triggers and
+# the bytes of ForwardMsgs they produce (what the server sends to the browser,
+# before websocket compression).
+#
+#   python bench_render.py                        # current working tree
+#   python bench_render.py --rev HEAD~1           # a previous commit, for before/after
+#   python bench_render.py tic.py --moves 4
+#
+# A click on a widget inside an st.fragment is replayed as a fragment rerun,
+# the way the browser sends it, so partial reruns are measured as such.
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+
+APPS = ["New_01.py", "try.py", "new_tic.py", "tic.py"]
+EMPTY_LABELS = ("", "💠")
+HERE = os.path.dirname(os.path.abspath(__file__))  # the working tree (and its git repo)
+
+# older revisions call st.experimental_rerun, which current Streamlit renamed
+if not hasattr(st, "experimental_rerun"):
+    st.experimental_rerun = st.rerun
+
+# -------------------------
+# Instrumentation
+# -------------------------
+_sent = [0]              # bytes of ForwardMsgs enqueued so far
+_widget_fragment = {}    # widget id -> id of the fragment that renders it
+_pending_fragments = []  # fragment ids of the next run (empty: full rerun)
+
+_enqueue = ForwardMsgQueue.enqueue
+
+def _counting_enqueue(self, msg):
+    # page_profile is usage telemetry (off with browser.gatherUsageStats=false)
+    if msg.WhichOneof("type") != "page_profile":
+        _sent[0] += msg.ByteSize()
+    if msg.HasField("delta") and msg.delta.fragment_id and msg.delta.HasField("new_element"):
+        el = msg.delta.new_element
+        kind = el.WhichOneof("type")
+        widget_id = getattr(getattr(el, kind), "id", None) if kind else None
+        if widget_id:
+            _widget_fragment[widget_id] = msg.delta.fragment_id
+    return _enqueue(self, msg)
+
+ForwardMsgQueue.enqueue = _counting_enqueue
+
+_RerunData = local_script_runner.RerunData
+
+def _rerun_data(**kwargs):
+    return _RerunData(fragment_id_queue=list(_pending_fragments), **kwargs)
+
+local_script_runner.RerunData = _rerun_data
+
+# -------------------------
+# Measurement
+# -------------------------
+def empty_cell(at):
+    for button in at.button:
+        if button.label.strip() in EMPTY_LABELS and button.key not in ("undo", "new", "reset", "swap"):
+            return button
+    return None
+
+def measure(path, moves):
+    at = AppTest.from_file(path, default_timeout=120)
+    _pending_fragments.clear()
+    cpu0, sent0 = time.process_time(), _sent[0]
+    at.run()
+    first = (time.process_time() - cpu0, _sent[0] - sent0)
+    samples = []
+    for _ in range(moves):
+        button = empty_cell(at)
+        if button is None:
+            break
+        fragment_id = _widget_fragment.get(button.id)
+        _pending_fragments[:] = [fragment_id] if fragment_id else []
+        cpu0, sent0 = time.process_time(), _sent[0]
+        button.click().run()
+        samples.append((time.process_time() - cpu0, _sent[0] - sent0))
+        if at.exception:
+            raise RuntimeError(f"{path}: {at.exception[0].message}")
+    return first, samples
+
+def export_rev(rev):
+    # checks the apps of a commit out into a temporary directory
+    tmp = tempfile.mkdtemp(prefix="bench_render_")
+    archive = subprocess.run(["git", "archive", rev], check=True, capture_output=True,
+                             cwd=HERE).stdout
+    subprocess.run(["tar", "-x", "-C", tmp], input=archive, check=True)
+    return tmp
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CPU time and bytes sent per move for the board apps")
+    ap.add_argument("apps", nargs="*", default=APPS)
+    ap.add_argument("--moves", type=int, default=5, help="cell clicks per app")
+    ap.add_argument("--rev", help="measure the apps of this git revision instead of the working tree")
+    args = ap.parse_args(argv)
+
+    root = export_rev(args.rev) if args.rev else HERE
+    sys.path.insert(0, root)
+    print(f"{'app':<12} {'moves':>5} {'first run ms':>12} {'first KB':>9} {'cpu ms/move':>12} {'KB/move':>8}")
+    for app in args.apps:
+        (cpu, sent), samples = measure(os.path.join(root, app), args.moves)
+        n = len(samples) or 1
+        cpu_move = sum(s[0] for s in samples) / n
+        kb_move = sum(s[1] for s in samples) / n / 1024
+        print(f"{app:<12} {len(samples):>5} {cpu * 1000:>12.1f} {sent / 1024:>9.1f} "
+              f"{cpu_move * 1000:>12.1f} {kb_move:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# bench_threats.py
+# Tactical puzzles for the large-board engine (threat_engine.py): 15x15,
+# five in a row, from a five in one to wins by five fours in a row (VCF) and by
+# quiet threes (VCT). Each puzzle gives the side to move, every move that solves
+# it and the time the engine is expected to need (a few times what it takes on
+# a desktop). The solutions were checked with a separate exhaustive search over
+# the cells next to the stones: every move that starts a win by fours, or failing
+# that every move that wins with at most two threes, or for the defence every
+# move after which no win by fours is left. Prints the engine's answer and time per puzzle, and exits with status 1
+# if any answer is wrong or slower than expected.
+#
+#   python bench_threats.py
+#   python bench_threats.py --repeat 5 --time-limit 0.5
+import argparse
+import sys
+import time
+from typing import NamedTuple, Tuple, FrozenSet
+
+from game_state import GameState, SearchState, CODES, X
+from threat_engine import choose_threat_move
+
+SIZE = 15
+WIN_LEN = 5
+
+class Puzzle(NamedTuple):
+    name: str
+    to_move: int
+    solutions: FrozenSet[Tuple[int, int]]
+    expected_s: float       # time the engine is expected to answer in
+    at: Tuple[int, int]     # board cell of the diagram's top-left corner
+    diagram: str
+
+PUZZLES = [
+    Puzzle("five", X, frozenset({(7, 5), (7, 10)}), 0.005, (5, 5), """
+        . . . . . .
+        . O . . O .
+        . X X X X .
+        . . O . O .
+    """),
+    Puzzle("block a four", X, frozenset({(9, 9)}), 0.005, (4, 4), """
+        X . . . . .
+        . O . . . .
+        . . O . . .
+        . . . O . X
+        . . . . O .
+        . . . . . .
+    """),
+    Puzzle("double four", X, frozenset({(8, 7)}), 0.005, (4, 3), """
+        . . . . O . .
+        . . . . X . .
+        . . . . X . .
+        . . . . X . .
+        O X X X . . .
+        . . . . . . .
+    """),
+    Puzzle("VCF in two", X, frozenset({(7, 7), (8, 7)}), 0.005, (4, 3), """
+        . . . . O . . O
+        . . . . X . X .
+        . . . . X X . .
+        . . . . . . . .
+        O X X X . . . .
+        . . . . . . . .
+    """),
+    Puzzle("VCF in three", X, frozenset({(10, 7)}), 0.01, (3, 3), """
+        . . . . . . . . .
+        . O . X . O . . .
+        . . O . X . O . .
+        . . O X . . . . .
+        . . . . O X . . .
+        . O . . O . . O .
+        . . . . . . O X .
+        . X X . . X X . .
+        . . . . . . . . .
+    """),
+    Puzzle("VCF in four", X, frozenset({(6, 6)}), 0.02, (3, 4), """
+        . . . . . . . .
+        . O . X . . O .
+        . X . . O O . .
+        . O . . X X . .
+        . . . X . O . .
+        . . . O . . X .
+        . . . . . X . .
+        . . . . . . O .
+        . . . . . . . .
+    """),
+    Puzzle("VCF in five", X, frozenset({(5, 6)}), 0.01, (3, 3), """
+        . . . . . . . . .
+        . O O X X . . . .
+        . O . . . O . . .
+        . . . X . . . X .
+        . . . X . X . O .
+        . . . O . . . . .
+        . . . . . . . X .
+        . . . . O O . X .
+        . . . . . . . . .
+    """),
+    Puzzle("double three", X, frozenset({(4, 7), (4, 8), (4, 9), (5, 8), (6, 6), (7, 4), (7, 7),
+                                            (8, 4), (8, 5), (9, 4)}), 0.01, (4, 4), """
+        . . . . . . .
+        . . . X . . .
+        . . . X . . .
+        . X X . . . .
+        . . . . . . .
+        . . O . . O .
+    """),
+    Puzzle("stop an open three", X, frozenset({(7, 5), (7, 9)}), 0.015, (5, 3), """
+        . . . . . . .
+        . . X . . . .
+        . . . O O O .
+        . . . . X . .
+        . . . . . . .
+    """),
+    Puzzle("two threes", X, frozenset({(5, 3), (8, 6), (8, 11)}), 0.12, (4, 3), """
+        . . . . . . . . .
+        . . . . X . O . .
+        . X O . . . . . .
+        . O X X . O . . .
+        . . . . . O X X .
+        . . . . . . . . .
+        . . O O . . . . .
+        . . . . . . . . .
+    """),
+]
+
+def puzzle_game(p:Puzzle) -> GameState:
+    # the diagram's stones on an empty board, p.to_move to play
+    game = SearchState.from_game(GameState(SIZE, WIN_LEN))
+    rows = [line.split() for line in p.diagram.strip().splitlines()]
+    for r, row in enumerate(rows):
+        for c, mark in enumerate(row):
+            if mark in CODES:
+                game.push((p.at[0] + r) * SIZE + p.at[1] + c, CODES[mark])
+    game.turn = p.to_move
+    return game
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tactical puzzles for the large-board engine")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per puzzle (best time is reported)")
+    ap.add_argument("--time-limit", type=float, default=None, help="threat search seconds per move")
+    args = ap.parse_args(argv)
+
+    kw = {} if args.time_limit is None else {"time_limit": args.time_limit}
+    print(f"{'puzzle':<20} {'answer':>8} {'ok':>4} {'ms':>8} {'expected ms':>12} {'nodes':>8}")
+    solved = slow = 0
+    for p in PUZZLES:
+        best = None
+        for _ in range(args.repeat):
+            counter = [0]
+            t0 = time.perf_counter()
+            move = choose_threat_move(puzzle_game(p), p.to_move, counter=counter, **kw)
+            sec = time.perf_counter() - t0
+            if best is None or sec < best[1]:
+                best = (move, sec, counter[0])
+        move, sec, nodes = best
+        ok = move in p.solutions
+        solved += ok
+        slow += ok and sec > p.expected_s
+        print(f"{p.name:<20} {str(move):>8} {('slow' if sec > p.expected_s else 'yes') if ok else 'NO':>4} "
+              f"{sec * 1000:>8.1f} {p.expected_s * 1000:>12.0f} {nodes:>8,}")
+    print(f"{solved}/{len(PUZZLES)} solved" + (f", {slow} slower than expected" if slow else ""))
+    return 0 if solved == len(PUZZLES) and not slow else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
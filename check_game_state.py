@@ -0,0 +1,82 @@
+# check_game_state.py
+# GameState's undo stack against snapshots: random games with power cells and
+# the swap rule mix plays, swaps and undos, and every undo must give back the
+# exact state from before the action it takes back (cells, turn, power mask,
+# swap flags, bitmasks, counts, winner). Exits with status 1 on the first
+# difference.
+#
+#   python check_game_state.py
+#   python check_game_state.py --games 2000 --seed 3
+import argparse
+import random
+import sys
+from array import array
+
+from game_state import X, O, GameState, power_layout
+
+VIEWS = ("x_stones", "o_stones", "over")  # derived values checked as well as the slots
+
+def snapshot(game):
+    # every slot by value (buffers copied) plus the derived views
+    state = {}
+    for name in GameState.__slots__:
+        value = getattr(game, name)
+        state[name] = bytes(value) if isinstance(value, (bytearray, array)) else value
+    for name in VIEWS:
+        state[name] = getattr(game, name)
+    return state
+
+def consistent(game):
+    # the bitmasks and counts agree with the cells
+    x_bits = sum(1 << i for i, p in enumerate(game.cells) if p == X)
+    o_bits = sum(1 << i for i, p in enumerate(game.cells) if p == O)
+    return (game.x_bits == x_bits and game.o_bits == o_bits
+            and game.x_stones == bin(x_bits).count("1") and game.o_stones == bin(o_bits).count("1")
+            and game.filled == game.x_stones + game.o_stones)
+
+def check_game(rng):
+    # one random game; None when every undo matched, else what differed
+    size = rng.randint(3, 7)
+    win_len = rng.randint(3, size)
+    game = GameState(size, win_len, power_cells=power_layout(size, rng.randint(0, size)),
+                     swap_after=rng.randint(0, 2), first=rng.choice("XO"))
+    before = []  # snapshot before each action still on the undo stack
+    for step in range(4 * size * size):
+        roll = rng.random()
+        state = snapshot(game)
+        if roll < 0.25 and before:
+            game.undo()
+            expected = before.pop()
+            now = snapshot(game)
+            diff = [k for k in expected if expected[k] != now[k]]
+            if diff:
+                return f"{size}x{size}/{win_len} step {step}: undo changed {', '.join(diff)}"
+        elif roll < 0.35 and game.swap_available:
+            game.swap()
+            before.append(state)
+        elif not game.over:
+            game.play(*divmod(rng.choice(game.free_cells()), size))
+            before.append(state)
+        if not consistent(game):
+            return f"{size}x{size}/{win_len} step {step}: bitmasks or counts disagree with the cells"
+        if len(before) != len(game.moves):
+            return f"{size}x{size}/{win_len} step {step}: undo stack has {len(game.moves)} entries, {len(before)} actions"
+    return None
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="GameState undo against snapshots")
+    ap.add_argument("--games", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    for g in range(args.games):
+        problem = check_game(rng)
+        if problem:
+            print(f"game {g}: {problem}")
+            return 1
+    print(f"{args.games} games: every undo restored the earlier state")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# check_searches.py
+# The profiled searches (tic_engine.minimax_profiled / negamax_profiled, run
+# while the tic.py stats panel is on) must play exactly like the plain ones they
+# shadow. On seeded random positions of each shape this compares:
+#
+#   minimax   score and move of minimax and minimax_profiled, every depth
+#   best      Analysis.best_move with and without stats, fresh tables
+#   scores    Analysis.scores with and without stats, fresh tables
+#
+# and exits with status 1 on the first difference.
+#
+#   python check_searches.py
+#   python check_searches.py --shapes 4x3 --depth 5 --positions 50
+import argparse
+import random
+import sys
+
+from game_state import GameState, SearchState
+from search_stats import SearchStats
+from tic_engine import Analysis, minimax, minimax_profiled, other
+
+def shape_list(text):
+    # "3x3,4x4" -> [(3, 3), (4, 4)]  (board size x win length)
+    return [tuple(int(v) for v in s.split("x")) for s in text.split(",") if s.strip()]
+
+def positions(size, win_len, count, rng):
+    # positions after a random number of random moves, none of them over
+    found = []
+    while len(found) < count:
+        game = GameState(size, win_len)
+        for _ in range(rng.randrange(size * size - 1)):
+            game.play(*divmod(rng.choice(game.free_cells()), size))
+            if game.over:
+                break
+        if not game.over:
+            found.append(game)
+    return found
+
+def differences(game, depth):
+    # (what, plain, profiled) of every search that differs on this position
+    p = game.turn
+    stats = SearchStats("ai", game.size, game.win_len, depth)
+    for d in range(1, depth + 1):
+        plain = minimax(SearchState.from_game(game), 0, d, True, p, other(p), [0])
+        profiled = minimax_profiled(SearchState.from_game(game), 0, d, True, p, other(p), [0], stats)
+        if plain != profiled:
+            yield f"minimax depth {d}", plain, profiled
+    plain = Analysis().best_move(game, depth)
+    profiled = Analysis().best_move(game, depth, stats=SearchStats("analysis"))
+    if plain != profiled:
+        yield "best", plain, profiled
+    plain = Analysis().scores(game, depth)
+    profiled = Analysis().scores(game, depth, stats=SearchStats("analysis"))
+    if plain != profiled:
+        yield "scores", plain, profiled
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Profiled searches against the plain ones")
+    ap.add_argument("--shapes", type=shape_list, default=[(3, 3), (4, 3), (4, 4), (5, 4)])
+    ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--positions", type=int, default=20, help="positions per shape")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    for size, win_len in args.shapes:
+        games = positions(size, win_len, args.positions, rng)
+        for game in games:
+            for what, plain, profiled in differences(game, args.depth):
+                print(f"{size}x{size}/{win_len} after {game.filled} moves, {what}: "
+                      f"plain {plain}, profiled {profiled}")
+                return 1
+        print(f"{size}x{size}/{win_len:<4} {len(games)} positions, depth {args.depth}: same")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
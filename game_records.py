@@ -0,0 +1,371 @@
+# game_records.py
+# Compact binary game records for the board apps and the arena, with a
+# streaming reader, analysis commands and a JSON converter.
+#
+# A record file starts with MAGIC, followed by one record per game:
+#
+#   size, win_len, swap_after, first, ai, result, power count  (1 byte each)
+#   move count                                                 (2 bytes, little endian)
+#   power cells                                                (1 byte each, cell index)
+#   moves                                                      (1 byte each, cell index or SWAP)
+#
+# `ai` is a bitmask of the players moved by an engine (X=1, O=2) and `result`
+# is the winner, DRAW, or 0 for an unfinished game. Records are only ever
+# appended; a sidecar index (<file>.idx, one 8-byte offset per game) gives
+# random access to game n. The reader streams one record at a time, so
+# statistics over millions of games run in constant memory.
+#
+#   python game_records.py info games.ttr
+#   python game_records.py openings games.ttr --plies 2
+#   python game_records.py blunders games.ttr --depth 4
+#   python game_records.py show games.ttr 17
+#   python game_records.py to-json games.ttr games.jsonl
+#   python game_records.py from-json games.jsonl games.ttr
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+from collections import defaultdict
+from typing import Iterator, NamedTuple, Optional
+
+from game_state import GameState, SearchState, geometry, EMPTY, X, O, NAMES, CODES, SWAP
+from tic_engine import WIN_SCORE, minimax, other
+from threat_engine import MIN_SIZE
+
+MAGIC = b"TTR\x01"
+HEADER = struct.Struct("<7BH")
+DRAW = 3
+RESULTS = (None, "X", "O", "draw")
+
+GAMES_PATH = os.environ.get("TIC_GAMES", "games.ttr")  # where the apps record games
+
+# -------------------------
+# Records
+# -------------------------
+class GameRecord(NamedTuple):
+    size: int
+    win_len: int
+    swap_after: int
+    first: int
+    ai: int
+    result: int
+    power: bytes    # power cells at the start of the game
+    moves: bytes    # cell index per move, SWAP for a swap
+
+    def start(self, cls=GameState) -> GameState:
+        # the empty board the game started from
+        return cls(self.size, self.win_len, [divmod(i, self.size) for i in self.power],
+                   self.swap_after, NAMES[self.first])
+
+    def replay(self, game:Optional[GameState]=None) -> Iterator[GameState]:
+        # plays the moves on one game (by default a fresh start()), yielding it after each
+        game = self.start() if game is None else game
+        for ply, m in enumerate(self.moves):
+            ok = game.swap() if m == SWAP else game.play(*divmod(m, self.size))
+            if not ok:
+                raise ValueError(f"illegal move {m} at ply {ply}")
+            yield game
+
+    def game(self) -> GameState:
+        game = self.start()
+        for game in self.replay(game):
+            pass
+        return game
+
+    def to_json(self) -> dict:
+        n = self.size
+        return {
+            "size": n,
+            "win_len": self.win_len,
+            "swap_after": self.swap_after,
+            "first": NAMES[self.first],
+            "ai": [NAMES[p] for p in (X, O) if self.ai & p],
+            "result": RESULTS[self.result],
+            "power": [list(divmod(i, n)) for i in self.power],
+            "moves": ["swap" if m == SWAP else list(divmod(m, n)) for m in self.moves],
+        }
+
+    @classmethod
+    def from_json(cls, d:dict) -> "GameRecord":
+        n = d["size"]
+        return cls(n, d["win_len"], d.get("swap_after", 0), CODES[d.get("first", "X")],
+                   sum(CODES[p] for p in d.get("ai", [])), RESULTS.index(d.get("result")),
+                   bytes(r*n + c for r, c in d.get("power", [])),
+                   bytes(SWAP if m == "swap" else m[0]*n + m[1] for m in d["moves"]))
+
+    def encode(self) -> bytes:
+        return (HEADER.pack(self.size, self.win_len, self.swap_after, self.first, self.ai,
+                            self.result, len(self.power), len(self.moves))
+                + self.power + self.moves)
+
+def record_of(game:GameState, ai:int=EMPTY) -> GameRecord:
+    power = game.start_power
+    if game.winner:
+        result = game.winner
+    else:
+        result = DRAW if game.over else EMPTY
+    return GameRecord(game.size, game.win_len, game.swap_after, game.first, ai, result,
+                      bytes(i for i in range(game.size*game.size) if power >> i & 1),
+                      bytes(m & 0xFF for m in game.moves))
+
+# -------------------------
+# Writing
+# -------------------------
+class RecordWriter:
+    """Appends records to a record file and its index; use as a context manager."""
+
+    def __init__(self, path:str=GAMES_PATH):
+        self.path = path
+        self.f = open(path, "ab")
+        if self.f.tell() == 0:
+            self.f.write(MAGIC)
+        self.idx = open(path + ".idx", "ab")
+
+    def write(self, record):
+        # a GameRecord, a GameState (recorded without engine players) or encoded bytes
+        if isinstance(record, GameState):
+            record = record_of(record)
+        if isinstance(record, GameRecord):
+            record = record.encode()
+        self.idx.write(struct.pack("<Q", self.f.tell()))
+        self.f.write(record)
+
+    def close(self):
+        self.f.close()
+        self.idx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_append_lock = threading.Lock()  # Streamlit sessions share the process
+
+def append_game(game:GameState, ai:int=EMPTY, path:str=GAMES_PATH):
+    with _append_lock, RecordWriter(path) as w:
+        w.write(record_of(game, ai))
+
+def record_once(state, game:GameState, ai:int=EMPTY, path:str=GAMES_PATH):
+    # appends a finished game once per session; finishing it again after an undo
+    # records the new ending. Games are told apart by their serial (an id() can
+    # be reused by a later game). A read-only disk never interrupts play.
+    if not game.over:
+        return
+    key = (game.serial, game.moves.tobytes())
+    if state.get("recorded") == key:
+        return
+    state["recorded"] = key
+    try:
+        append_game(game, ai, path)
+    except OSError:
+        pass
+
+# -------------------------
+# Reading
+# -------------------------
+def _read_record(f) -> Optional[GameRecord]:
+    head = f.read(HEADER.size)
+    if len(head) < HEADER.size:
+        return None
+    size, win_len, swap_after, first, ai, result, npower, nmoves = HEADER.unpack(head)
+    body = f.read(npower + nmoves)
+    if len(body) < npower + nmoves:
+        return None  # truncated by an interrupted append
+    return GameRecord(size, win_len, swap_after, first, ai, result, body[:npower], body[npower:])
+
+def _open(path:str):
+    f = open(path, "rb", buffering=1 << 16)
+    if f.read(len(MAGIC)) != MAGIC:
+        f.close()
+        raise ValueError(f"{path}: not a game record file")
+    return f
+
+def iter_records(path:str=GAMES_PATH) -> Iterator[GameRecord]:
+    with _open(path) as f:
+        while True:
+            rec = _read_record(f)
+            if rec is None:
+                return
+            yield rec
+
+def build_index(path:str=GAMES_PATH) -> int:
+    # rewrites <path>.idx from the record file; returns the number of games
+    games = 0
+    with _open(path) as f, open(path + ".idx", "wb") as idx:
+        while True:
+            pos = f.tell()
+            head = f.read(HEADER.size)
+            if len(head) < HEADER.size:
+                break
+            fields = HEADER.unpack(head)
+            f.seek(fields[-2] + fields[-1], os.SEEK_CUR)
+            idx.write(struct.pack("<Q", pos))
+            games += 1
+    return games
+
+def count_games(path:str=GAMES_PATH) -> int:
+    if not os.path.exists(path + ".idx"):
+        return build_index(path)
+    return os.path.getsize(path + ".idx") // 8
+
+def read_game(n:int, path:str=GAMES_PATH) -> GameRecord:
+    # record n (0-based) via the index
+    if not 0 <= n < count_games(path):
+        raise IndexError(f"{path}: no game {n}")
+    with open(path + ".idx", "rb") as idx:
+        idx.seek(8*n)
+        offset, = struct.unpack("<Q", idx.read(8))
+    with _open(path) as f:
+        f.seek(offset)
+        return _read_record(f)
+
+# -------------------------
+# Analysis
+# -------------------------
+def canonical_opening(rec:GameRecord, plies:int) -> bytes:
+    # the first `plies` moves under the board symmetry that makes them smallest,
+    # so rotated and mirrored openings count as one
+    opening = rec.moves[:plies]
+    return min(bytes(m if m == SWAP else sym[m] for m in opening)
+               for sym in geometry(rec.size, rec.win_len).symmetries)
+
+def opening_stats(records, plies:int=1, fold:bool=False):
+    # X wins / O wins / draws per (board size, first `plies` moves) of the finished
+    # games; fold merges openings that are symmetric images of each other
+    stats = defaultdict(lambda: [0, 0, 0])
+    for rec in records:
+        if rec.result and len(rec.moves) >= plies:
+            opening = canonical_opening(rec, plies) if fold else rec.moves[:plies]
+            stats[(rec.size, opening)][rec.result - 1] += 1
+    return stats
+
+def blunders(records, depth:int, every_move:bool=False):
+    # yields (game, ply, player, played, best, kind) where a move missed a forced
+    # win or walked into a forced loss that a depth-`depth` search sees; only
+    # engine moves unless every_move. Games on boards of the threat engine
+    # (threat_engine.MIN_SIZE and up) are skipped: full-width minimax cannot
+    # judge them in any reasonable time
+    for n, rec in enumerate(records):
+        if rec.size >= MIN_SIZE:
+            continue
+        state = SearchState.from_game(rec.start())
+        for ply, m in enumerate(rec.moves):
+            p = state.turn
+            if m != SWAP and (every_move or rec.ai & p):
+                best_score, best = minimax(state, 0, depth, True, p, other(p))
+                state.push(m, p)
+                if state.winner:
+                    score = 1000 - 1
+                else:
+                    # a power cell gives the mover another move, so p is still on turn
+                    again = bool(state.power >> m & 1)
+                    score, _ = minimax(state, 1, depth, again, p, other(p))
+                state.pop(m)
+                kind = None
+                if best_score >= WIN_SCORE and score < WIN_SCORE:
+                    kind = "missed win"
+                elif best_score > -WIN_SCORE and score <= -WIN_SCORE:
+                    kind = "losing move"
+                if kind:
+                    yield n, ply, NAMES[p], divmod(m, rec.size), divmod(best, rec.size), kind
+            if not (state.swap() if m == SWAP else state.play(*divmod(m, rec.size))):
+                break
+
+def board_text(game:GameState) -> str:
+    n = game.size
+    return "\n".join(" ".join(game.cell(r, c) or (":" if game.is_power(r, c) else ".")
+                              for c in range(n)) for r in range(n))
+
+# -------------------------
+# CLI
+# -------------------------
+def _cell(rc) -> str:
+    return f"({rc[0]},{rc[1]})"
+
+def cmd_info(args):
+    counts = [0, 0, 0, 0]
+    shapes = defaultdict(int)
+    moves = 0
+    for rec in iter_records(args.path):
+        counts[rec.result] += 1
+        shapes[(rec.size, rec.win_len)] += 1
+        moves += len(rec.moves)
+    games = sum(counts) or 1
+    print(f"{sum(counts)} games, {moves / games:.1f} moves/game")
+    print(f"  X wins {counts[X]}  O wins {counts[O]}  draws {counts[DRAW]}  unfinished {counts[EMPTY]}")
+    for (n, w), k in sorted(shapes.items()):
+        print(f"  {n}x{n} win {w}: {k}")
+
+def cmd_openings(args):
+    stats = opening_stats(iter_records(args.path), args.plies, args.fold)
+    rows = sorted(stats.items(), key=lambda t: -sum(t[1]))
+    print(f"{'opening':<24} {'games':>7} {'X win%':>7} {'O win%':>7} {'draw%':>7}")
+    for (n, opening), (xw, ow, dr) in rows[:args.top]:
+        total = xw + ow + dr
+        label = f"{n}x{n} " + " ".join("swap" if m == SWAP else _cell(divmod(m, n)) for m in opening)
+        print(f"{label:<24} {total:>7} {100*xw/total:>7.1f} {100*ow/total:>7.1f} {100*dr/total:>7.1f}")
+
+def cmd_blunders(args):
+    found = 0
+    for n, ply, player, played, best, kind in blunders(iter_records(args.path), args.depth, args.all):
+        found += 1
+        print(f"game {n} ply {ply + 1}: {player} played {_cell(played)}, {kind}; best {_cell(best)}")
+    skipped = sum(1 for rec in iter_records(args.path) if rec.size >= MIN_SIZE)
+    print(f"{found} blunders" + (f" ({skipped} games of {MIN_SIZE}x{MIN_SIZE} and up skipped)" if skipped else ""),
+          file=sys.stderr)
+
+def cmd_show(args):
+    rec = read_game(args.n, args.path)
+    print(json.dumps(rec.to_json()))
+    print(board_text(rec.game()))
+
+def cmd_to_json(args):
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+    with out:
+        # JSON Lines: one game object per line, written as the records stream in
+        for rec in iter_records(args.path):
+            out.write(json.dumps(rec.to_json(), separators=(",", ":")) + "\n")
+
+def cmd_from_json(args):
+    with open(args.path) as f, RecordWriter(args.out) as w:
+        for line in f:
+            if line.strip():
+                w.write(GameRecord.from_json(json.loads(line)))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Binary game records: stats, replay and JSON conversion")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("info", help="games, results and board shapes")
+    p.add_argument("path", nargs="?", default=GAMES_PATH)
+    p.set_defaults(func=cmd_info)
+    p = sub.add_parser("openings", help="win rates per opening")
+    p.add_argument("path", nargs="?", default=GAMES_PATH)
+    p.add_argument("--plies", type=int, default=1)
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--fold", action="store_true", help="merge rotated / mirrored openings")
+    p.set_defaults(func=cmd_openings)
+    p = sub.add_parser("blunders", help="engine moves that missed a forced win or allowed a forced loss")
+    p.add_argument("path", nargs="?", default=GAMES_PATH)
+    p.add_argument("--depth", type=int, default=4)
+    p.add_argument("--all", action="store_true", help="check every move, not only engine moves")
+    p.set_defaults(func=cmd_blunders)
+    p = sub.add_parser("show", help="print game n (0-based)")
+    p.add_argument("path")
+    p.add_argument("n", type=int)
+    p.set_defaults(func=cmd_show)
+    p = sub.add_parser("to-json", help="convert to JSON Lines")
+    p.add_argument("path")
+    p.add_argument("out", nargs="?", default="-")
+    p.set_defaults(func=cmd_to_json)
+    p = sub.add_parser("from-json", help="convert JSON Lines back to records (appends)")
+    p.add_argument("path")
+    p.add_argument("out")
+    p.set_defaults(func=cmd_from_json)
+    args = ap.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# game_state.py
+# Compact game state shared by the board apps (New_01.py, try.py, new_tic.py, tic.py)
+# and the headless tools. Every operation below is O(1) in the length of the game:
+# a move only touches the win lines through its own cell.
+#
+# A session holds one GameState: the board is a bytearray plus a bitmask per
+# player (stone counts are their popcounts), the move log an array, and the board
+# geometry (win lines, line masks, symmetries; see geometry()) is built once per
+# shape and held by reference by every game of it. Per-line stone counts only
+# live in the SearchState a search builds for itself (see session_memory.py for
+# the per-session footprint).
+import itertools
+import random
+from array import array
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+EMPTY, X, O = 0, 1, 2
+NAMES = (None, "X", "O")
+CODES = {"X": X, "O": O}
+
+_serials = itertools.count(1)  # GameState.serial (next() is atomic, so safe across threads)
+
+SWAP = 255  # undo-stack cell of a swap action (cell indices are always < 255)
+
+# each undo-stack entry is cell | info << 8; bits of the info byte:
+_PLAYER = 0b11
+_POWER = 1 << 2          # the move consumed a power cell
+_SWAP_OPENED = 1 << 3    # the move made the swap available
+
+# -------------------------
+# Board geometry
+# -------------------------
+def win_lines(n:int, win_len:int):
+    lines = []
+    # rows
+    for r in range(n):
+        for c in range(n - win_len + 1):
+            lines.append([(r,c+i) for i in range(win_len)])
+    # cols
+    for c in range(n):
+        for r in range(n - win_len + 1):
+            lines.append([(r+i,c) for i in range(win_len)])
+    # diag down-right
+    for r in range(n - win_len + 1):
+        for c in range(n - win_len + 1):
+            lines.append([(r+i,c+i) for i in range(win_len)])
+    # diag up-right
+    for r in range(win_len-1, n):
+        for c in range(n - win_len + 1):
+            lines.append([(r-i,c+i) for i in range(win_len)])
+    return lines
+
+def _symmetries(n:int):
+    # cell maps of the 8 symmetries of the square board (identity first):
+    # sym[i] is where cell i goes
+    maps = []
+    for t in range(8):
+        m = []
+        for r in range(n):
+            for c in range(n):
+                rr, cc = (c, r) if t & 4 else (r, c)
+                if t & 1:
+                    rr = n - 1 - rr
+                if t & 2:
+                    cc = n - 1 - cc
+                m.append(rr*n + cc)
+        maps.append(tuple(m))
+    return tuple(maps)
+
+class Geometry(NamedTuple):
+    """Everything about a board shape that stays fixed during a game, built once
+    per (size, win_len) and shared read-only by every game and session of it."""
+    size: int
+    win_len: int
+    lines: Tuple[Tuple[int, ...], ...]       # cells of each win line
+    lines_of: Tuple[Tuple[int, ...], ...]    # win lines through each cell
+    line_masks: Tuple[int, ...]              # bitmask of the cells of each win line
+    symmetries: Tuple[Tuple[int, ...], ...]  # cell maps of the 8 board symmetries
+
+@lru_cache(maxsize=None)
+def geometry(n:int, win_len:int) -> Geometry:
+    lines = tuple(tuple(r*n + c for r, c in line) for line in win_lines(n, win_len))
+    lines_of = [[] for _ in range(n*n)]
+    for li, line in enumerate(lines):
+        for i in line:
+            lines_of[i].append(li)
+    masks = tuple(sum(1 << i for i in line) for line in lines)
+    return Geometry(n, win_len, lines, tuple(tuple(ls) for ls in lines_of), masks, _symmetries(n))
+
+@lru_cache(maxsize=None)
+def neighbourhood(n:int, radius:int):
+    # cells within `radius` rows and columns of each cell (itself excluded)
+    return tuple(tuple(rr*n + cc
+                       for rr in range(max(0, r - radius), min(n, r + radius + 1))
+                       for cc in range(max(0, c - radius), min(n, c + radius + 1))
+                       if (rr, cc) != (r, c))
+                 for r in range(n) for c in range(n))
+
+@lru_cache(maxsize=None)
+def power_layout(n:int, count:int) -> Tuple[Tuple[int, int], ...]:
+    # the first `count` cells of a fixed shuffle per board size, from a private
+    # RNG so the layout never depends on (or disturbs) the global random state
+    cells = [(r, c) for r in range(n) for c in range(n)]
+    random.Random(42 + n).shuffle(cells)
+    return tuple(cells[:count])
+
+# -------------------------
+# Game state
+# -------------------------
+class GameState:
+    __slots__ = ("size", "win_len", "cells", "turn", "filled", "winner", "win_line", "power",
+                 "swap_after", "swap_available", "has_swapped", "moves", "x_bits", "o_bits",
+                 "serial", "geo")
+
+    def __init__(self, size:int=3, win_len:int=3, power_cells=(), swap_after:int=0, first:str="X"):
+        self.size = size
+        self.win_len = win_len
+        self.cells = bytearray(size * size)      # EMPTY / X / O per cell, row-major
+        self.turn = CODES[first]
+        self.filled = 0
+        self.winner = EMPTY
+        self.win_line = -1
+        self.power = 0                           # bitmask of unused power cells
+        for r, c in power_cells:
+            self.power |= 1 << (r*size + c)
+        self.swap_after = swap_after             # 0 disables the swap rule
+        self.swap_available = False
+        self.has_swapped = False
+        self.moves = array("H")                  # undo stack: cell | info << 8
+        self.x_bits = 0                          # bitmask of each player's stones
+        self.o_bits = 0
+        self.serial = next(_serials)             # identifies the game; copies keep it
+        self.geo = geometry(size, win_len)       # shared, read-only
+
+    def copy(self) -> "GameState":
+        # independent state (e.g. for a background search); the geometry stays shared
+        g = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(g, name, getattr(self, name))
+        g.cells = bytearray(self.cells)
+        g.moves = array("H", self.moves)
+        return g
+
+    # ---- raw make/unmake ----
+    def push(self, i:int, p:int):
+        self.cells[i] = p
+        self.filled += 1
+        if p == X:
+            bits = self.x_bits = self.x_bits | 1 << i
+        else:
+            bits = self.o_bits = self.o_bits | 1 << i
+        # only the lines through this cell can have been completed
+        if not self.winner:
+            masks = self.geo.line_masks
+            for li in self.geo.lines_of[i]:
+                if bits & masks[li] == masks[li]:
+                    self.winner = p
+                    self.win_line = li
+                    break
+
+    def pop(self, i:int):
+        p = self.cells[i]
+        self.cells[i] = EMPTY
+        self.filled -= 1
+        if p == X:
+            self.x_bits &= ~(1 << i)
+        else:
+            self.o_bits &= ~(1 << i)
+        # no move is ever made after a win, so a winner always comes from this move
+        self.winner = EMPTY
+        self.win_line = -1
+
+    # ---- game actions (power cells, swap rule, undo stack) ----
+    def play(self, r:int, c:int) -> bool:
+        i = r*self.size + c
+        if self.over or self.cells[i]:
+            return False
+        p = self.turn
+        info = p
+        self.push(i, p)
+        if not self.over:
+            # swap becomes available once both players placed swap_after stones
+            if (self.swap_after and not self.has_swapped and not self.swap_available
+                    and min(self.x_stones, self.o_stones) >= self.swap_after):
+                self.swap_available = True
+                info |= _SWAP_OPENED
+            # power cell: consumed, and the same player moves again
+            if self.power >> i & 1:
+                self.power &= ~(1 << i)
+                info |= _POWER
+            else:
+                self.turn = X + O - p
+        self.moves.append(i | info << 8)
+        return True
+
+    def swap(self) -> bool:
+        if not self.swap_available:
+            return False
+        self.swap_available = False
+        self.has_swapped = True
+        self.moves.append(SWAP)
+        return True
+
+    def undo(self) -> bool:
+        if not self.moves:
+            return False
+        m = self.moves.pop()
+        i, info = m & 0xFF, m >> 8
+        if i == SWAP:
+            self.has_swapped = False
+            self.swap_available = True
+            return True
+        self.pop(i)
+        if info & _POWER:
+            self.power |= 1 << i
+        if info & _SWAP_OPENED:
+            self.swap_available = False
+        self.turn = info & _PLAYER
+        return True
+
+    # ---- views ----
+    @property
+    def x_stones(self) -> int:
+        return bin(self.x_bits).count("1")
+
+    @property
+    def o_stones(self) -> int:
+        return bin(self.o_bits).count("1")
+
+    @property
+    def over(self) -> bool:
+        return bool(self.winner) or self.filled == len(self.cells)
+
+    @property
+    def turn_name(self) -> str:
+        return NAMES[self.turn]
+
+    @property
+    def winner_name(self) -> Optional[str]:
+        return NAMES[self.winner]
+
+    def cell(self, r:int, c:int) -> Optional[str]:
+        return NAMES[self.cells[r*self.size + c]]
+
+    def is_power(self, r:int, c:int) -> bool:
+        return bool(self.power >> (r*self.size + c) & 1)
+
+    @property
+    def power_left(self) -> int:
+        return bin(self.power).count("1")
+
+    @property
+    def moves_made(self) -> int:
+        return len(self.moves)
+
+    @property
+    def winning_cells(self) -> List[Tuple[int,int]]:
+        if self.win_line < 0:
+            return []
+        return [divmod(i, self.size) for i in self.geo.lines[self.win_line]]
+
+    @property
+    def history(self) -> List[Tuple[str,int,int]]:
+        # (player, r, c) per move, oldest first; swap actions are skipped
+        return [(NAMES[m >> 8 & _PLAYER], *divmod(m & 0xFF, self.size))
+                for m in self.moves if m & 0xFF != SWAP]
+
+    @property
+    def first(self) -> int:
+        # player who opened the game (a swap is never the first action)
+        return self.moves[0] >> 8 & _PLAYER if self.moves else self.turn
+
+    @property
+    def start_power(self) -> int:
+        # bitmask of the power cells the game started with
+        power = self.power
+        for m in self.moves:
+            if m >> 8 & _POWER:
+                power |= 1 << (m & 0xFF)
+        return power
+
+    def free_cells(self) -> List[int]:
+        cells = self.cells
+        return [i for i in range(len(cells)) if not cells[i]]
+
+class SearchState(GameState):
+    """GameState plus the stones of each player per win line, kept up to date by
+    push/pop so the search detects wins and evaluates positions without scanning
+    cells. Built per search; sessions only hold the plain GameState."""
+    __slots__ = ("counts",)
+
+    @classmethod
+    def from_game(cls, game:GameState) -> "SearchState":
+        s = cls.__new__(cls)
+        for name in GameState.__slots__:
+            setattr(s, name, getattr(game, name))
+        s.cells = bytearray(game.cells)
+        s.moves = array("H", game.moves)
+        nlines = len(s.geo.lines)
+        s.counts = bytearray(2*nlines)           # X's stones per line, then O's
+        lines_of = s.geo.lines_of
+        for i, p in enumerate(s.cells):
+            if p:
+                base = (p - 1)*nlines
+                for li in lines_of[i]:
+                    s.counts[base + li] += 1
+        return s
+
+    def copy(self) -> "SearchState":
+        return SearchState.from_game(self)
+
+    def line_counts(self, p:int) -> memoryview:
+        # stones of player p in each win line
+        nlines = len(self.counts) >> 1
+        base = (p - 1)*nlines
+        return memoryview(self.counts)[base:base + nlines]
+
+    def push(self, i:int, p:int):
+        self.cells[i] = p
+        self.filled += 1
+        if p == X:
+            self.x_bits |= 1 << i
+        else:
+            self.o_bits |= 1 << i
+        counts = self.counts
+        base = (p - 1)*(len(counts) >> 1)
+        for li in self.geo.lines_of[i]:
+            counts[base + li] += 1
+            if counts[base + li] == self.win_len and not self.winner:
+                self.winner = p
+                self.win_line = li
+
+    def pop(self, i:int):
+        p = self.cells[i]
+        GameState.pop(self, i)
+        counts = self.counts
+        base = (p - 1)*(len(counts) >> 1)
+        for li in self.geo.lines_of[i]:
+            counts[base + li] -= 1
@@ -0,0 +1,432 @@
+# load_test.py
+# Concurrent-session load test for the Streamlit apps of this repo.
+#
+# Each app runs in a real `streamlit run` server and many sessions drive it at
+# once over the websocket protocol the browser speaks. Every session loads the
+# page, then plays a seeded sequence of realistic interactions:
+#   - typing values and picking operations in the calculator;
+#   - full games on the boards, with undos and new games;
+#   - games against the tic.py AI at several depths.
+# The report gives per-interaction latency percentiles, throughput, and the CPU
+# time and resident-memory growth of the server process. A click's latency runs
+# until the page is idle again, so an AI move includes the search and the
+# progress polling the browser would do. Seeds are fixed, so runs repeat, and
+# --rev / --json / --compare put two commits side by side.
+#
+#   python load_test.py                                # every app, 20 sessions each
+#   python load_test.py tic.py --sessions 50 --depths 1,3,5
+#   python load_test.py --rev HEAD~3 --json before.json
+#   python load_test.py --json after.json
+#   python load_test.py --compare before.json after.json
+#
+# Needs the `websockets` package (a dependency of recent Streamlit servers).
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+try:
+    import websockets
+except ImportError:  # reported by main()
+    websockets = None
+
+APPS = ["scientific calculator", "New_01.py", "try.py", "new_tic.py", "tic.py"]
+EMPTY_LABELS = ("", "💠")
+GAME_OVER = re.compile(r"winner:|draw!", re.I)
+RUN_TIMEOUT = 120  # seconds one interaction may take before it counts as an error
+HERE = os.path.dirname(os.path.abspath(__file__))  # the working tree (and its git repo)
+
+# -------------------------
+# Websocket session
+# -------------------------
+class Widget:
+    __slots__ = ("kind", "id", "label", "fragment_id", "proto")
+
+    def __init__(self, kind, proto, fragment_id):
+        self.kind = kind
+        self.id = proto.id
+        self.label = getattr(proto, "label", "")
+        self.fragment_id = fragment_id
+        self.proto = proto
+
+    @property
+    def key(self):
+        # the user key is the last part of the widget id ("$$ID-<hash>-<key>")
+        return self.id.rsplit("-", 1)[-1]
+
+class Session:
+    """One browser tab: sends reruns with widget states and keeps the rendered
+    elements of the page, the way the frontend does."""
+
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.elements = {}     # delta path -> (kind, proto, fragment id)
+        self.auto_reruns = {}  # fragment id -> interval (st.fragment(run_every=...))
+        self.samples = []      # (action, seconds)
+        self.errors = 0
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    # ---- page state ----
+    def _on_message(self, msg):
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            fragments = set(msg.new_session.fragment_ids_this_run)
+            if fragments:
+                self.elements = {p: e for p, e in self.elements.items() if e[2] not in fragments}
+            else:
+                self.elements = {}
+                self.auto_reruns = {}
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            el = msg.delta.new_element
+            el_kind = el.WhichOneof("type")
+            if el_kind == "exception":
+                self.errors += 1
+            self.elements[tuple(msg.metadata.delta_path)] = (el_kind, getattr(el, el_kind), msg.delta.fragment_id)
+        elif kind == "auto_rerun":
+            self.auto_reruns[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+        elif kind == "stop_auto_rerun":
+            self.auto_reruns.pop(msg.stop_auto_rerun.fragment_id, None)
+
+    def widgets(self, kind=None):
+        return [Widget(k, proto, frag) for k, proto, frag in self.elements.values()
+                if getattr(proto, "id", "") and (kind is None or k == kind)]
+
+    def find(self, kind, label=None, key=None):
+        for w in self.widgets(kind):
+            if (label is None or w.label.startswith(label)) and (key is None or w.key == key):
+                return w
+        return None
+
+    def texts(self, kind):
+        return [proto.body for k, proto, _ in self.elements.values() if k == kind]
+
+    # ---- interactions ----
+    async def _run(self, widget=None, fragment_id="", auto=False, **value):
+        msg = BackMsg()
+        state = msg.rerun_script
+        if widget is not None:
+            ws = state.widget_states.widgets.add()
+            ws.id = widget.id
+            for field, v in value.items():
+                if field == "double_array_value":
+                    ws.double_array_value.data.extend(v)
+                else:
+                    setattr(ws, field, v)
+            fragment_id = widget.fragment_id
+        state.fragment_id = fragment_id
+        state.is_auto_rerun = auto
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(await self.ws.recv())
+            self._on_message(fm)
+            if (fm.WhichOneof("type") == "script_finished"
+                    and fm.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN):
+                return
+
+    async def interact(self, action, widget=None, **value):
+        # one user action, timed until the page is idle again: the rerun it triggers
+        # plus the fragment polling the browser does while a run_every fragment is shown
+        if widget is None and value:
+            self.errors += 1  # the page does not show the widget this action needs
+            return
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._interact(widget, **value), RUN_TIMEOUT)
+        except (asyncio.TimeoutError, websockets.ConnectionClosed):
+            self.errors += 1
+        self.samples.append((action, time.perf_counter() - t0))
+
+    async def _interact(self, widget, **value):
+        await self._run(widget, **value)
+        while self.auto_reruns:
+            fragment_id, interval = next(iter(self.auto_reruns.items()))
+            await asyncio.sleep(interval)
+            await self._run(fragment_id=fragment_id, auto=True)
+
+    async def load(self):
+        await self.interact("load")
+
+    async def click(self, action, widget):
+        await self.interact(action, widget, trigger_value=True)
+
+# -------------------------
+# Scenarios
+# -------------------------
+def empty_cells(s):
+    return [w for w in s.widgets("button") if w.label.strip() in EMPTY_LABELS]
+
+def game_over(s):
+    return any(GAME_OVER.search(t) for t in s.texts("alert")) or not empty_cells(s)
+
+async def calculator(s, rng, opts):
+    await s.load()
+    while True:
+        a = s.find("text_input", "Value a")
+        await s.interact("type a", a, string_value=str(rng.randint(-50, 200)))
+        yield
+        b = s.find("text_input", "Value b")
+        await s.interact("type b", b, string_value=str(round(rng.uniform(0.5, 12), 2)))
+        yield
+        op = s.find("selectbox", "Operation")
+        await s.interact("select op", op, string_value=rng.choice(list(op.proto.options)))
+        yield
+        await s.click("save", s.find("button", "Save to history"))
+        yield
+
+async def board(s, rng, opts):
+    # New_01.py, try.py, new_tic.py: two humans sharing one board
+    await s.load()
+    while True:
+        if game_over(s):
+            await s.click("new game", s.find("button", "New Game") or s.find("button", "Reset"))
+        elif rng.random() < 0.1 and s.find("button", "Undo"):
+            await s.click("undo", s.find("button", "Undo"))
+        else:
+            await s.click("move", rng.choice(empty_cells(s)))
+        yield
+
+async def tic(s, rng, opts):
+    # Human vs AI at the session's depth; a move includes the AI's reply
+    await s.load()
+    depth = opts["depth"]
+    await s.interact("settings", s.find("slider", "AI depth"), double_array_value=[float(depth)])
+    yield
+    while True:
+        if game_over(s):
+            await s.click("reset", s.find("button", "Reset game"))
+        else:
+            await s.click(f"move d{depth}", rng.choice(empty_cells(s)))
+        yield
+
+SCENARIOS = {"scientific calculator": calculator, "tic.py": tic}
+
+async def drive(url, app, index, args, interactions):
+    rng = random.Random(args.seed * 100_003 + index)
+    opts = {"depth": args.depths[index % len(args.depths)]}
+    s = Session(url)
+    await asyncio.sleep(args.ramp * index / max(args.sessions, 1))
+    try:
+        await s.connect()
+        steps = SCENARIOS.get(app, board)(s, rng, opts)
+        for _ in range(interactions):
+            await steps.__anext__()
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+    except (OSError, websockets.ConnectionClosed):
+        s.errors += 1
+    return s
+
+# -------------------------
+# Server
+# -------------------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def proc_stats(pid):
+    # (cpu seconds, resident bytes) of a process (Linux), zeros where /proc is unavailable
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        return cpu, rss
+    except (OSError, StopIteration):
+        return 0.0, 0
+
+# older revisions call st.experimental_rerun, which current Streamlit removed
+# (bench_render.py patches it in-process the same way)
+RERUN_SHIM = ("import streamlit as st\n"
+              "if not hasattr(st, 'experimental_rerun'):\n"
+              "    st.experimental_rerun = st.rerun\n")
+
+def start_server(root, app, port, env, shim=False):
+    script = os.path.join(root, app)
+    if shim or not app.endswith(".py"):
+        # the server runs a wrapper: the shim (with --rev) and the app's source in a
+        # .py file, as `streamlit run` wants one; it still runs from the app's directory
+        tmp = tempfile.mkdtemp(prefix="load_test_")
+        script = os.path.join(tmp, os.path.splitext(app)[0].replace(" ", "_") + ".py")
+        with open(os.path.join(root, app), encoding="utf-8") as f:
+            source = f.read()
+        with open(script, "w", encoding="utf-8") as f:
+            f.write((RERUN_SHIM if shim else "") + source)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", script, "--server.headless", "true",
+         "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{app}: server did not start")
+
+def percentile(sorted_values, q):
+    # nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+async def load_app(root, app, args, env):
+    port = free_port()
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    proc = start_server(root, app, port, env, shim=args.rev is not None)
+    try:
+        # a short session first, so lazy imports and the script cache are not counted as load
+        warm = await drive(url, app, args.sessions, args, 4)
+        await warm.close()
+        cpu0, rss0 = proc_stats(proc.pid)
+        t0 = time.perf_counter()
+        sessions = await asyncio.gather(*(drive(url, app, i, args, args.interactions) for i in range(args.sessions)))
+        wall = time.perf_counter() - t0
+        cpu1, rss1 = proc_stats(proc.pid)
+        await asyncio.gather(*(s.close() for s in sessions))
+    finally:
+        proc.terminate()
+        proc.wait()
+    by_action = defaultdict(list)
+    for s in sessions:
+        for action, sec in s.samples:
+            by_action[action].append(sec * 1000)
+    actions = {}
+    for action, ms in sorted(by_action.items()):
+        ms.sort()
+        actions[action] = {"n": len(ms), "p50": percentile(ms, 50), "p90": percentile(ms, 90),
+                           "p99": percentile(ms, 99), "max": ms[-1]}
+    interactions = sum(len(s.samples) for s in sessions)
+    return {
+        "sessions": args.sessions,
+        "interactions": interactions,
+        "wall_s": wall,
+        "throughput": interactions / wall if wall else 0.0,
+        "cpu_s": cpu1 - cpu0,
+        "cpu_ms_per_interaction": (cpu1 - cpu0) * 1000 / max(interactions, 1),
+        "rss_mib": (rss1 - rss0) / 2**20,
+        "rss_kib_per_session": (rss1 - rss0) / 1024 / max(args.sessions, 1),
+        "errors": sum(s.errors for s in sessions),
+        "actions": actions,
+    }
+
+# -------------------------
+# Report
+# -------------------------
+def print_app(app, r, out=sys.stdout):
+    out.write(f"\n{app}: {r['sessions']} sessions, {r['interactions']} interactions in {r['wall_s']:.1f}s "
+              f"-> {r['throughput']:.1f}/s, server CPU {r['cpu_s']:.1f}s "
+              f"({r['cpu_ms_per_interaction']:.1f} ms/interaction), RSS +{r['rss_mib']:.1f} MiB "
+              f"({r['rss_kib_per_session']:.0f} KiB/session), {r['errors']} errors\n")
+    out.write(f"  {'action':<14} {'n':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}\n")
+    for action, a in r["actions"].items():
+        out.write(f"  {action:<14} {a['n']:>6} {a['p50']:>9.1f} {a['p90']:>9.1f} {a['p99']:>9.1f} {a['max']:>9.1f}\n")
+
+def compare(before_path, after_path, out=sys.stdout):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    out.write(f"{before['rev']} -> {after['rev']}\n")
+
+    def delta(a, b):
+        return f"{a:>9.1f} -> {b:>9.1f} ({(b - a) / a * 100 if a else 0:+.0f}%)"
+
+    for app, b in after["apps"].items():
+        a = before["apps"].get(app)
+        if a is None:
+            continue
+        out.write(f"\n{app}\n")
+        out.write(f"  throughput/s    {delta(a['throughput'], b['throughput'])}\n")
+        out.write(f"  cpu ms/inter.   {delta(a['cpu_ms_per_interaction'], b['cpu_ms_per_interaction'])}\n")
+        out.write(f"  RSS KiB/session {delta(a['rss_kib_per_session'], b['rss_kib_per_session'])}\n")
+        for action, bb in b["actions"].items():
+            aa = a["actions"].get(action)
+            if aa:
+                out.write(f"  {action:<14} p50 {delta(aa['p50'], bb['p50'])}   p90 {delta(aa['p90'], bb['p90'])}\n")
+
+# -------------------------
+# CLI
+# -------------------------
+def export_rev(rev):
+    # checks the apps of a commit out into a temporary directory
+    tmp = tempfile.mkdtemp(prefix="load_test_")
+    archive = subprocess.run(["git", "archive", rev], check=True, capture_output=True,
+                             cwd=HERE).stdout
+    subprocess.run(["tar", "-x", "-C", tmp], input=archive, check=True)
+    return tmp
+
+def rev_label(rev):
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", rev or "HEAD"], check=True,
+                             capture_output=True, text=True, cwd=HERE).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return rev or "worktree"
+    return sha if rev else f"{sha}+worktree"
+
+def int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit apps")
+    ap.add_argument("apps", nargs="*", default=APPS)
+    ap.add_argument("--sessions", type=int, default=20, help="concurrent sessions per app")
+    ap.add_argument("--interactions", type=int, default=30, help="interactions per session after the page load")
+    ap.add_argument("--think", type=float, default=0.2, help="mean think time between interactions (s)")
+    ap.add_argument("--ramp", type=float, default=2.0, help="seconds over which the sessions connect")
+    ap.add_argument("--depths", type=int_list, default=[1, 2, 3], help="tic.py AI depths, cycled over sessions")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--rev", help="load-test the apps of this git revision instead of the working tree")
+    ap.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON results")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if websockets is None:
+        sys.exit("load_test.py needs the websockets package (pip install websockets)")
+
+    root = export_rev(args.rev) if args.rev else HERE
+    env = dict(os.environ)
+    env["TIC_GAMES"] = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "games.ttr")  # keep games.ttr clean
+    results = {
+        "rev": rev_label(args.rev),
+        "config": {k: getattr(args, k) for k in ("sessions", "interactions", "think", "ramp", "depths", "seed")},
+        "apps": {},
+    }
+    for app in args.apps:
+        r = asyncio.run(load_app(root, app, args, env))
+        results["apps"][app] = r
+        print_app(app, r)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+if __name__ == "__main__":
+    main()
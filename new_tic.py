@@ -1,5 +1,6 @@
 # app.py
 import streamlit as st
+from game_state import GameState
 
 st.set_page_config(page_title="Tic-Tac-Toe (Simple 3x3)", page_icon="❎", layout="centered")
 
@@ -65,88 +66,55 @@ st.markdown(
 st.title("Tic-Tac-Toe — Simple 3×3")
 st.caption("No extras — just a plain 3×3 board. X is blue, O is red. Background has a subtle light reflection.")
 
-# --- Game logic helpers ---
-def init_board():
-    return [[None for _ in range(3)] for _ in range(3)]
+# --- Session state init ---
+if "game" not in st.session_state:
+    st.session_state.game = GameState(3, 3)   # X starts
 
-def check_winner(board):
-    # rows
-    for r in range(3):
-        if board[r][0] and board[r][0] == board[r][1] == board[r][2]:
-            return board[r][0]
-    # cols
-    for c in range(3):
-        if board[0][c] and board[0][c] == board[1][c] == board[2][c]:
-            return board[0][c]
-    # diagonals
-    if board[0][0] and board[0][0] == board[1][1] == board[2][2]:
-        return board[0][0]
-    if board[0][2] and board[0][2] == board[1][1] == board[2][0]:
-        return board[0][2]
-    # draw?
-    if all(board[r][c] is not None for r in range(3) for c in range(3)):
-        return "Draw"
-    return None
+# partial reruns: a click inside the board only re-renders the board (Streamlit >= 1.37)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
 
-# --- Session state init ---
-if "board" not in st.session_state:
-    st.session_state.board = init_board()
-if "turn" not in st.session_state:
-    st.session_state.turn = "X"   # X starts
-if "game_over" not in st.session_state:
-    st.session_state.game_over = False
-if "message" not in st.session_state:
-    st.session_state.message = ""
+# --- Callbacks (run before the rerun, so each move renders once) ---
+def on_cell(r, c):
+    # moves after game over or on an occupied cell are ignored by play()
+    st.session_state.game.play(r, c)
+
+def on_reset():
+    st.session_state.game = GameState(3, 3)
 
 # --- Controls ---
 cols = st.columns([1,1,1])
 with cols[0]:
-    if st.button("Reset"):
-        st.session_state.board = init_board()
-        st.session_state.turn = "X"
-        st.session_state.game_over = False
-        st.session_state.message = ""
+    st.button("Reset", key="reset", on_click=on_reset)
 
 st.caption("Click a white cell to place the current symbol.")
 
-# --- Board UI (3x3 grid) ---
-grid_cols = [st.columns(3) for _ in range(3)]  # rows of columns
-
-for r in range(3):
-    for c in range(3):
-        label = st.session_state.board[r][c] or " "  # empty label is a single space so aria-label isn't empty
-        key = f"cell_{r}_{c}_{sum(1 for row in st.session_state.board for _ in row if _ is not None)}"
-        if grid_cols[r][c].button(label, key=key):
-            # do not allow moves after game over or on occupied cell
-            if st.session_state.game_over:
-                pass
-            elif st.session_state.board[r][c] is not None:
-                pass
-            else:
-                st.session_state.board[r][c] = st.session_state.turn
-                winner = check_winner(st.session_state.board)
-                if winner:
-                    st.session_state.game_over = True
-                    if winner == "Draw":
-                        st.session_state.message = "It's a draw!"
-                    else:
-                        st.session_state.message = f"Winner: {winner}"
-                else:
-                    st.session_state.turn = "O" if st.session_state.turn == "X" else "X"
-
-# --- Status message ---
-st.write("")
-if st.session_state.message:
-    if st.session_state.message.startswith("Winner"):
-        st.success(st.session_state.message)
+@fragment
+def board_view():
+    game = st.session_state.game
+
+    # --- Board UI (3x3 grid) ---
+    grid_cols = [st.columns(3) for _ in range(3)]  # rows of columns
+
+    for r in range(3):
+        for c in range(3):
+            label = game.cell(r, c) or " "  # empty label is a single space so aria-label isn't empty
+            # stable key: the same widget is updated in place from move to move
+            grid_cols[r][c].button(label, key=f"cell_{r}_{c}", on_click=on_cell, args=(r, c))
+
+    # --- Status message ---
+    st.write("")
+    if game.winner:
+        st.success(f"Winner: {game.winner_name}")
+    elif game.over:
+        st.info("It's a draw!")
     else:
-        st.info(st.session_state.message)
-else:
-    st.info(f"Turn: {st.session_state.turn}")
-
-# --- Simple board text (for accessibility) ---
-st.write("")
-st.markdown("**Board (rows top→bottom):**")
-for r in range(3):
-    row_display = [st.session_state.board[r][c] or "." for c in range(3)]
-    st.write(" | ".join(row_display))
+        st.info(f"Turn: {game.turn_name}")
+
+    # --- Simple board text (for accessibility) ---
+    st.write("")
+    st.markdown("**Board (rows top→bottom):**")
+    for r in range(3):
+        row_display = [game.cell(r, c) or "." for c in range(3)]
+        st.write(" | ".join(row_display))
+
+board_view()
@@ -0,0 +1,198 @@
+# search_stats.py
+# Search statistics for the tic.py stats panel and an offline log of them.
+#
+# A SearchStats is filled by the profiled twins of the engine's searches
+# (tic_engine.minimax_profiled / negamax_profiled), which only run when the panel
+# is on, so the plain searches carry no counters at all. Per search it holds:
+#
+#   nodes, interior nodes and children per ply (branching = children / interior)
+#   leaves       positions scored by the heuristic at the depth limit
+#   terminals    wins, losses and full boards
+#   cutoffs      alpha-beta cutoffs (the analysis search; the AI's minimax is full width)
+#   tt           transposition-table probes and hits (the analysis search)
+#   iterations   seconds and nodes of each iterative-deepening depth (the
+#                threat search of large boards only records this, as one step
+#                of depth 0: it is time-limited, not depth-limited)
+#   ponder       whether the AI's answer was already being searched (a ponder hit)
+#
+# Each finished search is appended as one JSON line to a rolling log
+# (STATS_PATH, rotated at LOG_BYTES into LOG_BACKUPS older files), which this
+# script summarizes per board shape, depth and search kind:
+#
+#   python search_stats.py                       # summary of search_stats.jsonl
+#   python search_stats.py other.jsonl --last 200
+import argparse
+import json
+import logging
+import os
+from collections import defaultdict
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List
+
+STATS_PATH = os.environ.get("TIC_STATS", "search_stats.jsonl")  # where the apps log searches
+LOG_BYTES = 1 << 20
+LOG_BACKUPS = 3
+PLIES = 32   # deepest ply counted (the apps search at most depth 6)
+STATS_KEPT = 10  # searches a tic.py session keeps for the panel's rolling table
+
+class SearchStats:
+    """Counters of one search (an AI move or an analysis of every move)."""
+    __slots__ = ("kind", "size", "win_len", "depth", "nodes", "interior", "children", "leaves",
+                 "terminals", "cutoffs", "tt_probes", "tt_hits", "iterations", "ponder_hit")
+
+    def __init__(self, kind:str="ai", size:int=0, win_len:int=0, depth:int=0):
+        self.kind = kind
+        self.size = size
+        self.win_len = win_len
+        self.depth = depth
+        self.nodes = [0] * PLIES
+        self.interior = [0] * PLIES
+        self.children = [0] * PLIES
+        self.leaves = 0
+        self.terminals = 0
+        self.cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.iterations = []   # (depth, seconds, total nodes so far)
+        self.ponder_hit = False
+
+    # ---- recording (called by the searches) ----
+    def root(self, moves:int):
+        # root node of a search whose driver loops over the root moves itself
+        self.nodes[0] += 1
+        self.interior[0] += 1
+        self.children[0] += moves
+
+    def iteration(self, depth:int, seconds:float, nodes:int=None):
+        # one finished iterative-deepening depth (nodes: total so far, by default
+        # the per-ply counts; searches without them pass their node counter)
+        self.iterations.append((depth, seconds, self.total_nodes if nodes is None else nodes))
+
+    # ---- views ----
+    @property
+    def total_nodes(self) -> int:
+        return sum(self.nodes) or (self.iterations[-1][2] if self.iterations else 0)
+
+    @property
+    def seconds(self) -> float:
+        return sum(sec for _, sec, _ in self.iterations)
+
+    @property
+    def plies(self) -> int:
+        return max((d + 1 for d, n in enumerate(self.nodes) if n), default=0)
+
+    def branching(self) -> List[float]:
+        # average children of an expanded node, per ply
+        return [self.children[d] / self.interior[d] if self.interior[d] else 0.0
+                for d in range(self.plies)]
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def ply_rows(self) -> List[Dict]:
+        # one row per ply: nodes and branching, summed over every iteration
+        branching = self.branching()
+        return [{"ply": d, "nodes": self.nodes[d], "branching": round(branching[d], 2)}
+                for d in range(self.plies)]
+
+    def iteration_rows(self) -> List[Dict]:
+        # one row per iterative-deepening depth: its time and the nodes it added
+        rows, before = [], 0
+        for d, sec, nodes in self.iterations:
+            rows.append({"depth": d, "ms": round(sec * 1000, 1), "nodes": nodes - before})
+            before = nodes
+        return rows
+
+    def to_json(self) -> dict:
+        n = self.plies
+        return {
+            "kind": self.kind, "size": self.size, "win_len": self.win_len, "depth": self.depth,
+            "nodes": self.nodes[:n], "interior": self.interior[:n], "children": self.children[:n],
+            "leaves": self.leaves, "terminals": self.terminals, "cutoffs": self.cutoffs,
+            "tt_probes": self.tt_probes, "tt_hits": self.tt_hits,
+            "iterations": [[d, round(sec, 6), nodes] for d, sec, nodes in self.iterations],
+            "ponder_hit": self.ponder_hit,
+        }
+
+# -------------------------
+# Rolling log
+# -------------------------
+_logger = None
+
+def _log() -> logging.Logger:
+    # one rotating file per process, shared by every session (logging locks it)
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger("tic.search_stats")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = RotatingFileHandler(STATS_PATH, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS,
+                                          encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+def log_stats(stats:SearchStats):
+    try:
+        _log().info(json.dumps(stats.to_json(), separators=(",", ":")))
+    except OSError:
+        pass  # the log is a diagnostic; never fail a move over it
+
+def read_log(path:str=STATS_PATH):
+    # entries of the log and its rotated files, oldest first
+    paths = [f"{path}.{k}" for k in range(LOG_BACKUPS, 0, -1)] + [path]
+    for p in paths:
+        if os.path.exists(p):
+            with open(p, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+# -------------------------
+# Summary
+# -------------------------
+def summarize(entries):
+    # per (kind, size, win_len, depth): searches, mean nodes / ms, effective
+    # branching factor, cutoffs per expanded node, table and ponder hit rates
+    groups = defaultdict(list)
+    for e in entries:
+        groups[(e["kind"], e["size"], e["win_len"], e["depth"])].append(e)
+    rows = []
+    for (kind, size, win_len, depth), es in sorted(groups.items()):
+        nodes = sum(sum(e["nodes"]) or (e["iterations"][-1][2] if e["iterations"] else 0) for e in es)
+        ms = sum(sum(it[1] for it in e["iterations"]) for e in es) * 1000
+        interior = sum(sum(e["interior"]) for e in es)
+        children = sum(sum(e["children"]) for e in es)
+        probes = sum(e["tt_probes"] for e in es)
+        rows.append({
+            "kind": kind, "shape": f"{size}x{size}/{win_len}", "depth": depth, "searches": len(es),
+            "nodes": nodes / len(es), "ms": ms / len(es),
+            "branching": children / interior if interior else 0.0,
+            "cutoffs/node": sum(e["cutoffs"] for e in es) / interior if interior else 0.0,
+            "tt hit%": 100 * sum(e["tt_hits"] for e in es) / probes if probes else 0.0,
+            "ponder hit%": 100 * sum(e["ponder_hit"] for e in es) / len(es),
+        })
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Summary of the tic.py search-stats log")
+    ap.add_argument("path", nargs="?", default=STATS_PATH)
+    ap.add_argument("--last", type=int, default=0, help="only the last N searches")
+    args = ap.parse_args(argv)
+
+    entries = list(read_log(args.path))
+    if args.last:
+        entries = entries[-args.last:]
+    print(f"{'kind':<9} {'shape':<8} {'depth':>5} {'searches':>8} {'nodes':>10} {'ms':>9} "
+          f"{'branching':>9} {'cutoffs/node':>12} {'tt hit%':>8} {'ponder hit%':>11}")
+    for r in summarize(entries):
+        print(f"{r['kind']:<9} {r['shape']:<8} {r['depth']:>5} {r['searches']:>8} {r['nodes']:>10,.0f} "
+              f"{r['ms']:>9.1f} {r['branching']:>9.2f} {r['cutoffs/node']:>12.2f} {r['tt hit%']:>8.1f} "
+              f"{r['ponder hit%']:>11.1f}")
+    print(f"{len(entries)} searches")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# threat_engine.py
+# AI for the large tic.py boards (6x6 up to 15x15, typically five in a row),
+# where the full-width minimax of tic_engine cannot look far enough ahead.
+#
+# Moves are chosen by threat-space search over the win windows of the board:
+#   four   a window the player can complete with one more stone; the opponent
+#          must answer on its last empty cell
+#   three  a window one stone short of a four; open and broken threes alike
+#          are found as windows, whichever cells of the window are empty
+# VCF (victory by continuous fours) plays only fours, each forcing the single
+# reply, until a double four or a five. VCT (victory by continuous threats)
+# also plays threes; a move counts as a threat when the attacker would win by
+# VCF if the defender ignored it, and the defender's answers are the cells of
+# that VCF plus the defender's own fours. Quiet moves are only searched near
+# existing stones (candidate_moves) and ranked by a window-pattern evaluation.
+# The search stops at a deadline, so a move takes under a second on 15x15.
+import time
+from typing import Dict, List, Optional
+
+from game_state import GameState, SearchState, neighbourhood
+from tic_engine import SearchCancelled, other
+
+RADIUS = 2            # candidate moves lie within this many cells of a stone
+TIME_LIMIT = 0.8      # seconds of threat search per move (the answer comes within 1 s)
+VCF_DEPTH = 12        # attacker fours in one VCF line
+VCT_DEPTH = 3         # attacker threats (threes or fours) in one VCT line
+MIN_SIZE = 6          # boards this large use the threat engine
+
+class _OutOfTime(Exception):
+    pass
+
+def uses_threat_search(game:GameState) -> bool:
+    return game.size >= MIN_SIZE
+
+# -------------------------
+# Board patterns
+# -------------------------
+def _lines_with(state:SearchState, p:int, k:int) -> List[int]:
+    # win windows holding k stones of p and none of the opponent
+    mine = state.line_counts(p)
+    theirs = state.line_counts(other(p))
+    return [li for li, (a, b) in enumerate(zip(mine, theirs)) if a == k and not b]
+
+def win_squares(state:SearchState, p:int) -> List[int]:
+    # cells where p completes a window now
+    cells = state.cells
+    found = []
+    for li in _lines_with(state, p, state.win_len - 1):
+        for i in state.geo.lines[li]:
+            if not cells[i] and i not in found:
+                found.append(i)
+    return found
+
+def threat_moves(state:SearchState, p:int, short:int) -> Dict[int, int]:
+    # cells that leave a window `short` stones from complete, with how many
+    # windows each one does it for (fours: short=1, threes: short=2)
+    k = state.win_len - short - 1
+    if k < 1:
+        return {}
+    cells = state.cells
+    found = {}
+    for li in _lines_with(state, p, k):
+        for i in state.geo.lines[li]:
+            if not cells[i]:
+                found[i] = found.get(i, 0) + 1
+    return found
+
+def candidate_moves(game:GameState, radius:int=RADIUS) -> List[int]:
+    # empty cells near a stone; the centre on an empty board
+    n = game.size
+    cells = game.cells
+    if not game.filled:
+        return [(n // 2) * n + n // 2]
+    near = neighbourhood(n, radius)
+    found = set()
+    for i in range(len(cells)):
+        if cells[i]:
+            found.update(j for j in near[i] if not cells[j])
+    return sorted(found)
+
+_WEIGHTS = (0, 1, 8, 64, 512, 4096, 32768, 262144)
+
+def move_scores(game:GameState, p:int=None) -> Dict[int, int]:
+    # pattern value of every candidate move for p (by default the side to move):
+    # windows it extends for p plus windows of the opponent it blocks
+    state = game if isinstance(game, SearchState) else SearchState.from_game(game)
+    p = state.turn if p is None else p
+    mine = state.line_counts(p)
+    theirs = state.line_counts(other(p))
+    scores = {}
+    for i in candidate_moves(state):
+        sc = 0
+        for li in state.geo.lines_of[i]:
+            a, b = mine[li], theirs[li]
+            if not b:
+                sc += _WEIGHTS[a + 1] * 2
+            if not a:
+                sc += _WEIGHTS[b + 1]
+        scores[i] = sc
+    return scores
+
+# -------------------------
+# Threat-space search
+# -------------------------
+class ThreatSearch:
+    """VCF / VCT search on one SearchState, with a deadline and a node counter
+    (the counter protocol of tic_engine.minimax, including cancellation)."""
+
+    def __init__(self, state:SearchState, deadline:float, counter):
+        self.state = state
+        self.deadline = deadline
+        self.counter = counter
+        self.failed = set()   # (cells, attacker, depth) already searched without success
+
+    def _tick(self):
+        counter = self.counter
+        counter[0] += 1
+        if not counter[0] & 63:
+            if len(counter) > 1 and counter[1].is_set():
+                raise SearchCancelled
+            if time.perf_counter() > self.deadline:
+                raise _OutOfTime
+
+    def vcf(self, p:int, depth:int=VCF_DEPTH) -> Optional[List[int]]:
+        # winning line of fours for p with p to move (attacker and defender
+        # moves alternating), or None
+        self._tick()
+        state = self.state
+        q = other(p)
+        wins = win_squares(state, p)
+        if wins:
+            return wins[:1]
+        blocks = win_squares(state, q)
+        if len(blocks) > 1 or depth <= 0:
+            return None
+        key = (bytes(state.cells), p, depth)
+        if key in self.failed:
+            return None
+        fours = threat_moves(state, p, 1)
+        moves = sorted(fours, key=lambda i: -fours[i])
+        if blocks:
+            moves = [i for i in moves if i == blocks[0]]
+        for m in moves:
+            state.push(m, p)
+            replies = win_squares(state, p)
+            line = None
+            if len(replies) > 1:
+                line = [m]  # double four
+            elif replies:
+                d = replies[0]
+                state.push(d, q)
+                if not state.winner:
+                    rest = self.vcf(p, depth - 1)
+                    if rest is not None:
+                        line = [m, d] + rest
+                state.pop(d)
+            state.pop(m)
+            if line is not None:
+                return line
+        self.failed.add(key)
+        return None
+
+    def vct(self, p:int, depth:int=VCT_DEPTH) -> Optional[List[int]]:
+        # first moves of a winning line of threats for p with p to move, or None
+        self._tick()
+        state = self.state
+        q = other(p)
+        line = self.vcf(p)
+        if line is not None or depth <= 0:
+            return line
+        if win_squares(state, q):
+            return None  # the defender's four must be answered; vcf() covered that
+        key = (bytes(state.cells), -p, depth)
+        if key in self.failed:
+            return None
+        threats = threat_moves(state, p, 2)
+        for i, k in threat_moves(state, p, 1).items():
+            threats[i] = threats.get(i, 0) + 4*k
+        for m in sorted(threats, key=lambda i: -threats[i]):
+            state.push(m, p)
+            if self._refuted(p, depth):
+                state.pop(m)
+                continue
+            state.pop(m)
+            return [m]
+        self.failed.add(key)
+        return None
+
+    def _refuted(self, p:int, depth:int) -> bool:
+        # after the attacker's threat: can the defender stop every continuation?
+        state = self.state
+        q = other(p)
+        fours = win_squares(state, p)
+        if len(fours) > 1:
+            return False
+        if fours:
+            defences = fours
+        else:
+            # a threat: with a free move the attacker would win by fours
+            line = self.vcf(p)
+            if line is None:
+                return True
+            defences = set(line)
+            defences.update(threat_moves(state, q, 1))
+        for d in defences:
+            state.push(d, q)
+            try:
+                if state.winner or self.vct(p, depth - 1) is None:
+                    return True
+            finally:
+                state.pop(d)
+        return False
+
+# -------------------------
+# Move choice
+# -------------------------
+def choose_threat_move(game:GameState, ai_p:int, time_limit:float=TIME_LIMIT, counter=None):
+    # (r, c) for ai_p: win, block, forcing win, defence against a forcing win,
+    # then the best-valued candidate move
+    counter = [0] if counter is None else counter
+    state = SearchState.from_game(game)
+    q = other(ai_p)
+    n = game.size
+    wins = win_squares(state, ai_p)
+    if wins:
+        return divmod(wins[0], n)
+    blocks = win_squares(state, q)
+    scores = move_scores(state, ai_p)
+    if blocks:
+        return divmod(max(blocks, key=lambda i: scores.get(i, 0)), n)
+    if not scores:
+        return None
+    search = ThreatSearch(state, time.perf_counter() + time_limit, counter)
+    ranked = sorted(scores, key=lambda i: -scores[i])
+    try:
+        line = search.vcf(ai_p) or search.vct(ai_p)
+        if line:
+            return divmod(line[0], n)
+        # the opponent's forcing win, if it had the move: answer on its cells
+        # (or with a four of our own) and keep the first answer that stops it
+        threat = search.vcf(q) or search.vct(q, 2)
+        if threat:
+            defences = set(threat) | set(threat_moves(state, ai_p, 1))
+            for d in sorted(defences, key=lambda i: -scores.get(i, 0)):
+                state.push(d, ai_p)
+                try:
+                    stopped = search.vcf(q) is None and search.vct(q, 2) is None
+                finally:
+                    state.pop(d)
+                if stopped:
+                    return divmod(d, n)
+    except _OutOfTime:
+        pass
+    return divmod(ranked[0], n)
@@ -1,379 +1,465 @@
 # app.py
 import streamlit as st
-import copy
-import random
-from typing import List, Optional, Tuple
+from game_state import GameState, CODES, EMPTY
+from tic_engine import DEFAULT_SETTINGS, Settings, settings_for, generate_power_cells, other, shared_analysis, WIN_SCORE
+from ai_worker import IDLE_SECONDS, AnalysisJob, SearchJob, Ponderer
+from search_stats import STATS_KEPT, SearchStats, log_stats
+from threat_engine import move_scores, uses_threat_search
+from game_records import record_once
 
 st.set_page_config(page_title="Unique Tic-Tac-Toe", page_icon="🎯", layout="centered")
 st.title("🎯 Unique Tic-Tac-Toe (Power Cells + Swap Rule)")
 st.markdown("""
 Unique twists:
-- Board sizes: 3×3, 4×4, or 5×5.
+- Board sizes from 3×3 up to 15×15.
 - Adjustable win-length (3,4,5 depending on board).
 - **Power Cells**: special cells give the mover an extra immediate move.
 - **Swap Rule**: after each player placed one or two initial moves (configurable), the second player can swap symbols.
-- Human vs Human (local) or Human vs AI (minimax, depth-limited).
+- Human vs Human (local) or Human vs AI (minimax, depth-limited; threat-space search on boards from 6×6).
 - Undo, Reset, and move history. Winning line highlight.
+- Optional search-stats panel: nodes, leaves, cutoffs, branching and time per ply of each AI search.
 """)
 
-# -------------------------
-# Utilities
-# -------------------------
-def new_board(n:int) -> List[List[Optional[str]]]:
-    return [[None for _ in range(n)] for _ in range(n)]
-
-def avail_moves(board):
-    moves = []
-    for r in range(len(board)):
-        for c in range(len(board)):
-            if board[r][c] is None:
-                moves.append((r,c))
-    return moves
-
-def board_full(board):
-    return all(cell is not None for row in board for cell in row)
-
-def generate_power_cells(n:int, count:int) -> List[Tuple[int,int]]:
-    # deterministic-ish: shuffle all cells then pick first count
-    cells = [(r,c) for r in range(n) for c in range(n)]
-    random.seed(42 + n)  # reproducible per size
-    random.shuffle(cells)
-    return cells[:count]
-
-def win_lines(n:int, win_len:int):
-    lines = []
-    # rows
-    for r in range(n):
-        for c in range(n - win_len + 1):
-            lines.append([(r,c+i) for i in range(win_len)])
-    # cols
-    for c in range(n):
-        for r in range(n - win_len + 1):
-            lines.append([(r+i,c) for i in range(win_len)])
-    # diag down-right
-    for r in range(n - win_len + 1):
-        for c in range(n - win_len + 1):
-            lines.append([(r+i,c+i) for i in range(win_len)])
-    # diag up-right
-    for r in range(win_len-1, n):
-        for c in range(n - win_len + 1):
-            lines.append([(r-i,c+i) for i in range(win_len)])
-    return lines
-
-def check_winner(board, win_len):
-    lines = win_lines(len(board), win_len)
-    for line in lines:
-        vals = [board[r][c] for r,c in line]
-        if vals[0] is not None and all(v == vals[0] for v in vals):
-            return vals[0], line
-    return None, None
-
-# -------------------------
-# Minimax (depth-limited)
-# -------------------------
-def minimax(board, win_len, depth, max_depth, is_max, ai_p, human_p):
-    winner, _ = check_winner(board, win_len)
-    if winner == ai_p:
-        return 1000 - depth, None
-    if winner == human_p:
-        return -1000 + depth, None
-    if board_full(board):
-        return 0, None
-    if depth >= max_depth:
-        return heuristic(board, win_len, ai_p, human_p), None
-
-    if is_max:
-        best = -10**9
-        best_move = None
-        for (r,c) in avail_moves(board):
-            board[r][c] = ai_p
-            sc, _ = minimax(board, win_len, depth+1, max_depth, False, ai_p, human_p)
-            board[r][c] = None
-            if sc > best:
-                best = sc
-                best_move = (r,c)
-        return best, best_move
-    else:
-        best = 10**9
-        best_move = None
-        for (r,c) in avail_moves(board):
-            board[r][c] = human_p
-            sc, _ = minimax(board, win_len, depth+1, max_depth, True, ai_p, human_p)
-            board[r][c] = None
-            if sc < best:
-                best = sc
-                best_move = (r,c)
-        return best, best_move
-
-def heuristic(board, win_len, ai_p, human_p):
-    # simple potential-line heuristic
-    def count_p(player):
-        cnt = 0
-        for line in win_lines(len(board), win_len):
-            vals = [board[r][c] for r,c in line]
-            if all(v is None or v == player for v in vals):
-                cnt += sum(1 for v in vals if v == player) + 1
-        return cnt
-    return count_p(ai_p) - count_p(human_p)
-
 # -------------------------
 # Session initialization
 # -------------------------
 if "settings" not in st.session_state:
-    st.session_state.settings = {
-        "size": 3,
-        "win_len": 3,
-        "mode": "Human vs AI",
-        "ai_depth": 3,
-        "first": "Human",
-        "ai_symbol": "O",
-        "power_cells_enabled": True,
-        "power_cells_count": 1,
-        "swap_rule_enabled": True,
-        "swap_after_moves_each": 1,  # after each placed this many moves, swap allowed
-        "symbols": {"X":"❌", "O":"⭕"}
-    }
-
-if "board" not in st.session_state:
-    n = st.session_state.settings["size"]
-    st.session_state.board = new_board(n)
-if "turn" not in st.session_state:
-    st.session_state.turn = "X" if st.session_state.settings["first"] == "Human" else st.session_state.settings["ai_symbol"]
-if "history" not in st.session_state:
-    st.session_state.history = []  # list of (player,r,c)
-if "game_over" not in st.session_state:
-    st.session_state.game_over = False
-if "winning_line" not in st.session_state:
-    st.session_state.winning_line = None
-if "power_cells" not in st.session_state:
-    s = st.session_state.settings
-    st.session_state.power_cells = generate_power_cells(s["size"], s["power_cells_count"]) if s["power_cells_enabled"] else []
-if "swap_available" not in st.session_state:
-    st.session_state.swap_available = False
-if "has_swapped" not in st.session_state:
-    st.session_state.has_swapped = False
+    st.session_state.settings = DEFAULT_SETTINGS
+
+def new_game(s:Settings) -> GameState:
+    power = generate_power_cells(s.size, s.power_cells_count) if s.power_cells_enabled else []
+    human_p = "O" if s.ai_symbol == "X" else "X"
+    return GameState(s.size, s.win_len, power,
+                     swap_after=s.swap_after_moves_each if s.swap_rule_enabled else 0,
+                     first=human_p if s.first == "Human" else s.ai_symbol)
+
+if "game" not in st.session_state:
+    st.session_state.game = new_game(st.session_state.settings)
+
+def cancel_ai():
+    # stops the background searches and the pondering (undo, reset, new settings)
+    for key in ("ai_job", "ponder", "analysis_job"):
+        job = st.session_state.pop(key, None)
+        if job is not None:
+            job.cancel()
 
 # -------------------------
 # Settings UI
 # -------------------------
 with st.expander("Settings (expand to customize)"):
     s = st.session_state.settings
-    size = st.selectbox("Board size", [3,4,5], index=[3,4,5].index(s["size"]))
+    sizes = list(range(3, 16))
+    size = st.selectbox("Board size", sizes, index=sizes.index(s.size))
     possible_win = [3]
     if size >=4: possible_win.append(4)
     if size >=5: possible_win.append(5)
-    win_len = st.selectbox("Win length", possible_win, index=possible_win.index(s["win_len"]) if s["win_len"] in possible_win else 0)
-    mode = st.selectbox("Mode", ["Human vs AI", "Human vs Human (Local)"], index=0 if s["mode"]=="Human vs AI" else 1)
-    ai_depth = st.slider("AI depth (difficulty)", 1, 6, s["ai_depth"])
-    first = st.radio("Who goes first?", ["Human", "AI"], index=0 if s["first"]=="Human" else 1)
-    ai_symbol = st.selectbox("AI symbol (if playing AI)", ["O","X"], index=0 if s["ai_symbol"]=="O" else 1)
-    power_cells_enabled = st.checkbox("Enable Power Cells (play again when you land on one)", value=s["power_cells_enabled"])
-    power_cells_count = st.slider("Power Cells count", 0, min(4, size*size//3), s["power_cells_count"])
-    swap_enabled = st.checkbox("Enable Swap Rule (second player may swap after initial moves)", value=s["swap_rule_enabled"])
-    swap_after = st.selectbox("Swap available after each player placed", [1,2], index=0 if s["swap_after_moves_each"]==1 else 1)
-    sym_x = st.text_input("Symbol for X (single char or emoji)", value=s["symbols"]["X"])
-    sym_o = st.text_input("Symbol for O (single char or emoji)", value=s["symbols"]["O"])
+    win_len = st.selectbox("Win length", possible_win, index=possible_win.index(s.win_len) if s.win_len in possible_win else 0)
+    mode = st.selectbox("Mode", ["Human vs AI", "Human vs Human (Local)"], index=0 if s.mode=="Human vs AI" else 1)
+    ai_depth = st.slider("AI depth (difficulty)", 1, 6, s.ai_depth)
+    first = st.radio("Who goes first?", ["Human", "AI"], index=0 if s.first=="Human" else 1)
+    ai_symbol = st.selectbox("AI symbol (if playing AI)", ["O","X"], index=0 if s.ai_symbol=="O" else 1)
+    power_cells_enabled = st.checkbox("Enable Power Cells (play again when you land on one)", value=s.power_cells_enabled)
+    power_cells_count = st.slider("Power Cells count", 0, min(4, size*size//3), s.power_cells_count)
+    swap_enabled = st.checkbox("Enable Swap Rule (second player may swap after initial moves)", value=s.swap_rule_enabled)
+    swap_after = st.selectbox("Swap available after each player placed", [1,2], index=0 if s.swap_after_moves_each==1 else 1)
+    sym_x = st.text_input("Symbol for X (single char or emoji)", value=s.symbols[0])
+    sym_o = st.text_input("Symbol for O (single char or emoji)", value=s.symbols[1])
     apply = st.button("Apply & Reset")
 
 # apply changes when requested
-if apply or any([
-    size != st.session_state.settings["size"],
-    win_len != st.session_state.settings["win_len"],
-    mode != st.session_state.settings["mode"],
-    ai_depth != st.session_state.settings["ai_depth"],
-    first != st.session_state.settings["first"],
-    ai_symbol != st.session_state.settings["ai_symbol"],
-    power_cells_enabled != st.session_state.settings["power_cells_enabled"],
-    power_cells_count != st.session_state.settings["power_cells_count"],
-    swap_enabled != st.session_state.settings["swap_rule_enabled"],
-    swap_after != st.session_state.settings["swap_after_moves_each"],
-    sym_x != st.session_state.settings["symbols"]["X"],
-    sym_o != st.session_state.settings["symbols"]["O"],
-]):
-    st.session_state.settings.update({
-        "size": size,
-        "win_len": win_len,
-        "mode": mode,
-        "ai_depth": ai_depth,
-        "first": first,
-        "ai_symbol": ai_symbol,
-        "power_cells_enabled": power_cells_enabled,
-        "power_cells_count": power_cells_count,
-        "swap_rule_enabled": swap_enabled,
-        "swap_after_moves_each": swap_after,
-        "symbols": {"X": sym_x or "X", "O": sym_o or "O"}
-    })
+new_settings = settings_for(
+    size=size,
+    win_len=win_len,
+    mode=mode,
+    ai_depth=ai_depth,
+    first=first,
+    ai_symbol=ai_symbol,
+    power_cells_enabled=power_cells_enabled,
+    power_cells_count=power_cells_count,
+    swap_rule_enabled=swap_enabled,
+    swap_after_moves_each=swap_after,
+    symbols=(sym_x or "X", sym_o or "O"),
+)
+if apply or new_settings != st.session_state.settings:
+    st.session_state.settings = new_settings
     # reset game
-    st.session_state.board = new_board(size)
-    st.session_state.history = []
-    st.session_state.game_over = False
-    st.session_state.winning_line = None
-    st.session_state.turn = "X" if first == "Human" else ai_symbol
-    st.session_state.power_cells = generate_power_cells(size, power_cells_count) if power_cells_enabled else []
-    st.session_state.swap_available = False
-    st.session_state.has_swapped = False
+    cancel_ai()
+    st.session_state.game = new_game(st.session_state.settings)
 
 # -------------------------
 # Game actions
 # -------------------------
 def make_move(r,c,player):
-    if st.session_state.game_over:
+    # a power cell keeps the turn with the same player (handled by GameState)
+    game = st.session_state.game
+    if game.turn != CODES[player]:
         return
-    if st.session_state.board[r][c] is not None:
-        return
-    st.session_state.board[r][c] = player
-    st.session_state.history.append((player,r,c))
-    winner, line = check_winner(st.session_state.board, st.session_state.settings["win_len"])
-    if winner:
-        st.session_state.game_over = True
-        st.session_state.winning_line = line
-    elif board_full(st.session_state.board):
-        st.session_state.game_over = True
-        st.session_state.winning_line = None
-    else:
-        # check swap availability: if swap enabled and both players have each placed swap_after_moves_each moves
-        counts = {"X":0,"O":0}
-        for p,_,_ in st.session_state.history:
-            counts[p]+=1
-        if st.session_state.settings["swap_rule_enabled"] and not st.session_state.has_swapped:
-            if counts["X"] >= st.session_state.settings["swap_after_moves_each"] and counts["O"] >= st.session_state.settings["swap_after_moves_each"]:
-                st.session_state.swap_available = True
-        # check power cell: same player moves again if cell is in power_cells
-        if (r,c) in st.session_state.power_cells:
-            # remove power cell so it's used once
-            st.session_state.power_cells.remove((r,c))
-            # same player's turn again
-            st.experimental_rerun()
-        else:
-            st.session_state.turn = "O" if st.session_state.turn == "X" else "X"
+    game.play(r, c)
+
+def vs_ai() -> bool:
+    return st.session_state.settings.mode == "Human vs AI"
+
+# the search runs on the shared worker pool and a polling fragment shows its
+# progress; without fragments (Streamlit < 1.37) the page waits for it as before
+BACKGROUND = hasattr(st, "fragment")
+# background jobs are abandoned once the page stops polling them (closed tab)
+IDLE = IDLE_SECONDS if BACKGROUND else None
+# a search is given this long to finish within the run that started it (most
+# replies do); after that a fragment next to the board polls it at this rate
+POLL_SECONDS = 0.3
 
 def ai_move():
-    if st.session_state.game_over:
+    # starts the AI's search when it holds the turn (or takes the pondered answer);
+    # on the human's turn, ponders on the human's likely replies instead
+    game = st.session_state.game
+    if not vs_ai() or game.over or "ai_job" in st.session_state:
         return
-    board_copy = copy.deepcopy(st.session_state.board)
-    ai_p = st.session_state.settings["ai_symbol"]
-    human_p = "O" if ai_p == "X" else "X"
-    depth = st.session_state.settings["ai_depth"]
-    _, mv = minimax(board_copy, st.session_state.settings["win_len"], 0, depth, True, ai_p, human_p)
-    if mv is None:
-        moves = avail_moves(st.session_state.board)
-        if not moves:
-            return
-        mv = random.choice(moves)
-    r,c = mv
-    make_move(r,c, ai_p)
+    ai_p = CODES[st.session_state.settings.ai_symbol]
+    depth = st.session_state.settings.ai_depth
+    make_stats = new_stats("ai") if st.session_state.get("search_stats") else None
+    ponder = st.session_state.get("ponder")
+    if game.turn != ai_p:
+        if ponder is None or ponder.key != bytes(game.cells):
+            if ponder is not None:
+                ponder.cancel()
+            st.session_state.ponder = Ponderer(game, depth, ai_p, make_stats=make_stats, idle=IDLE).start()
+        return
+    job = None
+    if ponder is not None:
+        del st.session_state.ponder
+        job = ponder.take(game)
+    st.session_state.ai_job = job = job or SearchJob(game, depth, ai_p, stats=make_stats and make_stats(),
+                                                     idle=IDLE).start()
+    if job.wait(POLL_SECONDS if BACKGROUND else None):
+        apply_ai()
+
+# -------------------------
+# Search stats (only collected while the panel is on)
+# -------------------------
+def new_stats(kind):
+    # SearchStats factory for the current settings
+    s = st.session_state.settings
+    return lambda: SearchStats(kind, s.size, s.win_len, s.ai_depth)
+
+def keep_stats(stats):
+    # newest first in the session, and one line in the rolling log file
+    kept = st.session_state.get("stats_kept", ())
+    st.session_state.stats_kept = (stats,) + kept[:STATS_KEPT - 1]
+    log_stats(stats)
+
+def apply_ai() -> bool:
+    # plays the move of a finished background search; True when the board changed
+    job = st.session_state.get("ai_job")
+    if job is None or not job.done:
+        return False
+    del st.session_state.ai_job
+    game = st.session_state.game
+    if job.key != bytes(game.cells):
+        return False  # the position changed meanwhile
+    if job.move is None:
+        # a pondered search cut short by its deadline as it was taken: search again
+        ai_move()
+        return False
+    if job.stats is not None:
+        keep_stats(job.stats)
+    game.play(*job.move)
+    # AI keeps the turn after a power cell; otherwise start pondering
+    ai_move()
+    return True
 
 # make AI first move if required (safe when nothing played)
-if st.session_state.settings["mode"] == "Human vs AI" and st.session_state.settings["first"] == "AI" and not st.session_state.history:
+if vs_ai() and st.session_state.settings.first == "AI" and not st.session_state.game.moves_made:
     ai_move()
 
 # -------------------------
-# Controls (left column)
+# Callbacks (run before the rerun, so each click renders once)
 # -------------------------
-left, right = st.columns([1,2])
-
-with left:
-    st.write("**Game controls**")
-    st.write(f"Mode: {st.session_state.settings['mode']}")
-    st.write(f"Board: {st.session_state.settings['size']}×{st.session_state.settings['size']}, Win: {st.session_state.settings['win_len']}")
-    st.write(f"Turn: {st.session_state.turn}  ({st.session_state.settings['symbols'][st.session_state.turn]})")
-    if st.session_state.game_over:
-        w, _ = check_winner(st.session_state.board, st.session_state.settings["win_len"])
-        if w:
-            st.success(f"Winner: {w} ({st.session_state.settings['symbols'][w]})")
-        else:
-            st.info("Draw!")
-    st.write(f"Power cells left: {len(st.session_state.power_cells)}")
-    if st.button("Undo last move"):
-        if st.session_state.history:
-            last = st.session_state.history.pop()
-            _, r, c = last
-            st.session_state.board[r][c] = None
-            st.session_state.game_over = False
-            st.session_state.winning_line = None
-            st.session_state.swap_available = False
-            st.session_state.has_swapped = False
-            # swap turn back
-            st.session_state.turn = "O" if st.session_state.turn == "X" else "X"
-    if st.button("Reset game"):
-        s = st.session_state.settings
-        st.session_state.board = new_board(s["size"])
-        st.session_state.history = []
-        st.session_state.game_over = False
-        st.session_state.winning_line = None
-        st.session_state.turn = "X" if s["first"] == "Human" else s["ai_symbol"]
-        st.session_state.power_cells = generate_power_cells(s["size"], s["power_cells_count"]) if s["power_cells_enabled"] else []
-        st.session_state.swap_available = False
-        st.session_state.has_swapped = False
-    if st.session_state.swap_available and not st.session_state.has_swapped:
-        st.write("Swap is available!")
-        if st.button("Swap symbols (second player)"):
-            # only allow swap by the player who is second to move (rough check: if last move made by X and X started, second is O)
-            # permit swap action for either to keep simple UI (game fairness trusts player)
-            s = st.session_state.settings
-            # swap mapping of symbols only
-            s["symbols"]["X"], s["symbols"]["O"] = s["symbols"]["O"], s["symbols"]["X"]
-            st.session_state.has_swapped = True
-            st.session_state.swap_available = False
-
-with right:
-    # draw grid of buttons (UI)
-    n = st.session_state.settings["size"]
-    sym = st.session_state.settings["symbols"]
-    grid_cols = [st.columns(n) for _ in range(n)]
-    for r in range(n):
-        for c in range(n):
-            val = st.session_state.board[r][c]
-            label = sym[val] if val is not None else ""
-            # visually mark power cells
-            is_power = (r,c) in st.session_state.power_cells
-            key = f"cell_{r}_{c}_{len(st.session_state.history)}"
-            style_label = label or ("💠" if is_power else " ")
-            if grid_cols[r][c].button(style_label, key=key):
-                # clicking behavior: enforce turn rules
-                if st.session_state.game_over:
-                    pass
-                else:
-                    # If Human vs AI: only allow human to place when it's human's turn
-                    if st.session_state.settings["mode"] == "Human vs AI":
-                        ai_p = st.session_state.settings["ai_symbol"]
-                        human_p = "O" if ai_p == "X" else "X"
-                        if st.session_state.turn != human_p:
-                            # not human turn
-                            pass
-                        else:
-                            make_move(r,c, human_p)
-                            if not st.session_state.game_over:
-                                ai_move()
-                    else:
-                        # Human vs Human: accept move of current turn
-                        make_move(r,c, st.session_state.turn)
+def on_cell(r, c):
+    # clicking behavior: enforce turn rules
+    game = st.session_state.game
+    if game.over:
+        return
+    cancel_analysis()  # its position is about to change
+    if vs_ai():
+        # If Human vs AI: only allow human to place when it's human's turn
+        human_p = other(CODES[st.session_state.settings.ai_symbol])
+        if game.turn != human_p:
+            return
+        make_move(r,c, game.turn_name)
+        ai_move()
+    else:
+        # Human vs Human: accept move of current turn
+        make_move(r,c, game.turn_name)
 
-    st.write("---")
-    st.markdown("**Legend:**")
-    st.markdown(f"- {st.session_state.settings['symbols']['X']}: X")
-    st.markdown(f"- {st.session_state.settings['symbols']['O']}: O")
-    st.markdown("- 💠 : Power Cell (play here and get an extra immediate move).")
+def on_undo():
+    # restores the turn, consumed power cells and swap state of the undone action;
+    # against the AI, undo back to the human's turn
+    cancel_ai()
+    game = st.session_state.game
+    game.undo()
+    if vs_ai():
+        ai_p = CODES[st.session_state.settings.ai_symbol]
+        while game.turn == ai_p and game.undo():
+            pass
+        ai_move()
+
+def on_reset():
+    cancel_ai()
+    st.session_state.game = new_game(st.session_state.settings)
+    if vs_ai() and st.session_state.settings.first == "AI":
+        ai_move()
+
+def on_swap():
+    # permit swap action for either to keep simple UI (game fairness trusts player)
+    st.session_state.game.swap()
+
+def display_symbols(game):
+    # the swap rule exchanges which symbol each player's stones are shown with
+    x, o = st.session_state.settings.symbols
+    if game.has_swapped:
+        x, o = o, x
+    return {"X": x, "O": o}
 
 # -------------------------
-# Board textual & history
+# Analysis heatmap
 # -------------------------
-st.write("---")
-st.subheader("Board (text view)")
-for r in range(len(st.session_state.board)):
-    row = [st.session_state.settings["symbols"][v] if v is not None else "." for v in st.session_state.board[r]]
-    st.write(" ".join(row))
-
-st.subheader("Move history (latest first)")
-for i, entry in enumerate(reversed(st.session_state.history[-50:]), 1):
-    p,r,c = entry
-    st.write(f"{i}. {p} ({st.session_state.settings['symbols'][p]}) → row {r+1}, col {c+1}")
-
-# highlight winning line visually (small extra)
-if st.session_state.winning_line:
+def analysis_key(game, depth):
+    return bytes(game.cells), game.turn, depth
+
+def cancel_analysis():
+    job = st.session_state.pop("analysis_job", None)
+    if job is not None:
+        job.cancel()
+
+def drop_analysis():
+    # heatmap off or game over: stop the search and forget its scores (the
+    # table is shared by every session of the board shape, see shared_analysis)
+    cancel_analysis()
+    st.session_state.pop("analysis_scores", None)
+
+def finish_analysis():
+    # keeps the scores of a finished analysis job
+    job = st.session_state.get("analysis_job")
+    if job is None or not job.done:
+        return
+    del st.session_state.analysis_job
+    if job.scores is not None:
+        st.session_state.analysis_scores = (analysis_key(job.game, job.depth), job.scores)
+        if job.stats is not None:
+            keep_stats(job.stats)
+
+def analysis_scores(game):
+    # score of every empty cell for the side to move, cached per position, or
+    # None while the analysis runs in the background; the shape's shared Analysis
+    # keeps its transposition table for the next positions. Large boards show
+    # the threat engine's pattern values of the candidate moves
+    depth = st.session_state.settings.ai_depth
+    key = analysis_key(game, depth)
+    finish_analysis()
+    cached = st.session_state.get("analysis_scores")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if uses_threat_search(game):
+        # as a percentage of the best candidate, to stay clear of WIN_SCORE
+        values = move_scores(game)
+        top = max(values.values(), default=1) or 1
+        cached = st.session_state.analysis_scores = (key, {i: 100 * v // top for i, v in values.items()})
+        return cached[1]
+    job = st.session_state.get("analysis_job")
+    if job is not None:
+        if analysis_key(job.game, job.depth) == key:
+            return None  # still running
+        cancel_analysis()
+    an = shared_analysis(game.size, game.win_len)
+    stats = new_stats("analysis")() if st.session_state.get("search_stats") else None
+    st.session_state.analysis_job = job = AnalysisJob(game, depth, an, stats, idle=IDLE).start()
+    if not BACKGROUND:
+        with st.spinner("Analysing every move…"):
+            job.wait()
+    elif not job.wait(POLL_SECONDS):
+        return None  # analysis_progress polls it from now on
+    finish_analysis()
+    return job.scores
+
+def score_text(sc):
+    # wins / losses as plies to the end, other scores as the heuristic value
+    if sc >= WIN_SCORE:
+        return f"W{1000 - sc}"
+    if sc <= -WIN_SCORE:
+        return f"L{1000 + sc}"
+    return f"{sc:+d}"
+
+def heatmap_css(game, scores):
+    # colours each empty cell's button (green good, red bad for the side to move)
+    # and overlays its score, without touching the button labels
+    plain = [abs(sc) for sc in scores.values() if abs(sc) < WIN_SCORE]
+    scale = max(plain, default=1) or 1
+    rules = []
+    for i, sc in scores.items():
+        r, c = divmod(i, game.size)
+        v = max(-1.0, min(1.0, sc / scale)) if abs(sc) < WIN_SCORE else (1.0 if sc > 0 else -1.0)
+        rgb = "34,160,80" if v >= 0 else "220,50,50"
+        rules.append(f".st-key-cell_{r}_{c} button {{ background: rgba({rgb},{0.15 + 0.6 * abs(v):.2f}); }}"
+                     f".st-key-cell_{r}_{c} button::after {{ content: '{score_text(sc)}'; font-size: 0.7em; }}")
+    return "<style>" + "".join(rules) + "</style>"
+
+# partial reruns: a click inside the game view only re-renders it (Streamlit >= 1.37)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
+
+if BACKGROUND:
+    # mounted next to the board by game_view while a job runs, so starting one
+    # needs no extra rerun; the page reruns once when a polled job is done
+    @st.fragment(run_every=POLL_SECONDS)
+    def ai_progress():
+        # polls the background search; a rerun shows its move on the board
+        job = st.session_state.get("ai_job")
+        if job is not None:
+            job.touch()
+        if job is None or job.done:
+            apply_ai()
+            st.rerun()
+        st.progress(job.depth_reached / job.depth,
+                    text=f"AI thinking… depth {job.depth_reached}/{job.depth} · {job.nodes:,} nodes")
+        best = job.best_so_far
+        if best is not None:
+            st.caption(f"Best move so far: row {best[0]+1}, col {best[1]+1}")
+
+    @st.fragment(run_every=POLL_SECONDS)
+    def analysis_progress():
+        # polls the background analysis; a rerun shows the heatmap
+        job = st.session_state.get("analysis_job")
+        if job is not None:
+            job.touch()
+        if job is None or job.done:
+            finish_analysis()
+            st.rerun()
+        st.caption(f"Analysing every move… {job.nodes:,} nodes")
+
+def stats_panel():
+    # the latest search in detail, then the last few as a rolling table
     st.write("---")
-    st.markdown("**Winning line:**")
-    for (r,c) in st.session_state.winning_line:
-        st.write(f"- row {r+1}, col {c+1}")
+    st.subheader("Search stats")
+    kept = st.session_state.get("stats_kept", ())
+    if not kept:
+        st.caption("No search since the panel was turned on: play a move (or turn on the heatmap).")
+        return
+    s = kept[0]
+    sec = s.seconds
+    nodes = s.total_nodes
+    cache = f"table hits {100 * s.tt_hit_rate:.0f}% of {s.tt_probes:,} probes" if s.tt_probes else "no table"
+    limit = f"depth {s.depth}" if s.depth else "time-limited"
+    st.write(f"**Last {s.kind} search** ({s.size}×{s.size}, {limit}): {nodes:,} nodes in "
+             f"{sec * 1000:.0f} ms ({nodes / sec if sec else 0:,.0f}/s) · {s.leaves:,} leaves · "
+             f"{s.terminals:,} wins/draws · {s.cutoffs:,} cutoffs · {cache}"
+             + (" · ponder hit" if s.ponder_hit else ""))
+    if s.plies:
+        st.table(s.ply_rows())
+    if len(s.iterations) > 1:
+        st.table(s.iteration_rows())
+    ai = [k for k in kept if k.kind != "analysis"]
+    if ai:
+        st.caption(f"Ponder hits: {sum(k.ponder_hit for k in ai)}/{len(ai)} of the recent AI moves")
+    st.table([{"search": k.kind, "depth": k.depth, "nodes": k.total_nodes, "ms": round(k.seconds * 1000, 1),
+               "cutoffs": k.cutoffs, "table hit %": round(100 * k.tt_hit_rate, 1) if k.tt_probes else None,
+               "ponder hit": k.ponder_hit} for k in kept])
+
+@fragment
+def game_view():
+    apply_ai()  # a polled search may have finished since
+    game = st.session_state.game
+    # a finished game is appended to the record file once (see game_records.py)
+    record_once(st.session_state, game, CODES[st.session_state.settings.ai_symbol] if vs_ai() else EMPTY)
+    if "ponder" in st.session_state:
+        st.session_state.ponder.touch()  # the page is still open
+    sym = display_symbols(game)
+
+    # -------------------------
+    # Controls (left column)
+    # -------------------------
+    left, right = st.columns([1,2])
+
+    with left:
+        st.write("**Game controls**")
+        st.write(f"Mode: {st.session_state.settings.mode}")
+        st.write(f"Board: {game.size}×{game.size}, Win: {game.win_len}")
+        st.write(f"Turn: {game.turn_name}  ({sym[game.turn_name]})")
+        if game.over:
+            w = game.winner_name
+            if w:
+                st.success(f"Winner: {w} ({sym[w]})")
+            else:
+                st.info("Draw!")
+        st.write(f"Power cells left: {game.power_left}")
+        st.button("Undo last move", key="undo", on_click=on_undo)
+        st.button("Reset game", key="reset", on_click=on_reset)
+        if game.swap_available:
+            st.write("Swap is available!")
+            st.button("Swap symbols (second player)", key="swap", on_click=on_swap)
+        analysis = st.checkbox("Analysis heatmap", key="analysis",
+                               help="Score every empty cell for the side to move (AI depth).")
+        show_stats = st.checkbox("Search stats", key="search_stats",
+                                 help="Count nodes, cutoffs and time per ply of the next searches.")
+
+    scores = None
+    if not analysis or game.over:
+        drop_analysis()
+    elif "ai_job" not in st.session_state:
+        scores = analysis_scores(game)
+
+    with right:
+        # draw grid of buttons (UI)
+        n = game.size
+        if BACKGROUND:
+            if "ai_job" in st.session_state:
+                ai_progress()
+            elif "analysis_job" in st.session_state:
+                analysis_progress()
+        if scores:
+            st.markdown(heatmap_css(game, scores), unsafe_allow_html=True)
+            best = max(scores, key=scores.get)
+            basis = "patterns" if uses_threat_search(game) else f"depth {st.session_state.settings.ai_depth}"
+            st.caption(f"Analysis for {game.turn_name} ({basis}): "
+                       f"best row {best // n + 1}, col {best % n + 1} ({score_text(scores[best])})")
+        grid_cols = [st.columns(n) for _ in range(n)]
+        for r in range(n):
+            for c in range(n):
+                val = game.cell(r, c)
+                label = sym[val] if val is not None else ""
+                # visually mark power cells
+                style_label = label or ("💠" if game.is_power(r, c) else " ")
+                # stable key: the same widget is updated in place from move to move
+                grid_cols[r][c].button(style_label, key=f"cell_{r}_{c}", on_click=on_cell, args=(r, c))
+
+        st.write("---")
+        st.markdown("**Legend:**")
+        st.markdown(f"- {sym['X']}: X")
+        st.markdown(f"- {sym['O']}: O")
+        st.markdown("- 💠 : Power Cell (play here and get an extra immediate move).")
+
+    if show_stats:
+        stats_panel()
+
+    # -------------------------
+    # Board textual & history
+    # -------------------------
+    st.write("---")
+    st.subheader("Board (text view)")
+    for r in range(game.size):
+        row = [sym[v] if v is not None else "." for v in (game.cell(r, c) for c in range(game.size))]
+        st.write(" ".join(row))
+
+    st.subheader("Move history (latest first)")
+    for i, entry in enumerate(reversed(game.history[-50:]), 1):
+        p,r,c = entry
+        st.write(f"{i}. {p} ({sym[p]}) → row {r+1}, col {c+1}")
+
+    # highlight winning line visually (small extra)
+    if game.winning_cells:
+        st.write("---")
+        st.markdown("**Winning line:**")
+        for (r,c) in game.winning_cells:
+            st.write(f"- row {r+1}, col {c+1}")
+
+game_view()
 
 st.caption("Tip: Use Power Cells for combo plays. Try 5×5 with 4-in-a-row and a few power cells for creative puzzles.")
@@ -0,0 +1,402 @@
+# tic_engine.py
+# Pure game logic for tic.py (no Streamlit), shared with the headless tools.
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, partial
+from typing import Dict, List, NamedTuple, Tuple
+
+from game_state import GameState, SearchState, power_layout, X, O
+
+# -------------------------
+# Settings
+# -------------------------
+class Settings(NamedTuple):
+    size: int = 3
+    win_len: int = 3
+    mode: str = "Human vs AI"
+    ai_depth: int = 3
+    first: str = "Human"
+    ai_symbol: str = "O"
+    power_cells_enabled: bool = True
+    power_cells_count: int = 1
+    swap_rule_enabled: bool = True
+    swap_after_moves_each: int = 1  # after each placed this many moves, swap allowed
+    symbols: Tuple[str, str] = ("❌", "⭕")  # display symbols of X and O
+
+@lru_cache(maxsize=4096)
+def _shared(settings:Settings) -> Settings:
+    return settings
+
+def settings_for(**kw) -> Settings:
+    # one immutable Settings object per distinct combination, shared by every
+    # session that uses it, so a session only holds a reference
+    if "symbols" in kw:
+        kw["symbols"] = tuple(sys.intern(x) for x in kw["symbols"])
+    return _shared(Settings(**kw))
+
+DEFAULT_SETTINGS = settings_for()
+
+# -------------------------
+# Utilities
+# -------------------------
+def generate_power_cells(n:int, count:int) -> List[Tuple[int,int]]:
+    # reproducible per size (game_state.power_layout); a fresh list per call
+    return list(power_layout(n, count))
+
+def other(player:int) -> int:
+    return X + O - player
+
+def position_rng(game:GameState) -> random.Random:
+    # private RNG seeded by the position, so a random fallback move is the same
+    # every time and never touches the global random state of the process
+    return random.Random(bytes(game.cells) + bytes((game.turn,)))
+
+WIN_SCORE = 900  # minimax scores beyond this are forced wins / losses
+
+# -------------------------
+# Minimax (depth-limited)
+# -------------------------
+# Searches a SearchState with push/pop, so no board copies are made per node.
+# `counter` is a list whose first item is incremented once per visited node, so
+# callers (e.g. arena.py) can report nodes per second without changing the
+# search. An optional second item is a cancel flag (anything with is_set(): a
+# threading.Event, or ai_worker.Budget with its deadline) polled every 1024
+# nodes; once it is set the search raises SearchCancelled (see ai_worker.py).
+_NO_COUNT = [0]
+
+class SearchCancelled(Exception):
+    pass
+
+def minimax(game:SearchState, depth, max_depth, is_max, ai_p, human_p, counter=_NO_COUNT):
+    counter[0] += 1
+    if not counter[0] & 1023 and len(counter) > 1 and counter[1].is_set():
+        raise SearchCancelled
+    winner = game.winner
+    if winner == ai_p:
+        return 1000 - depth, None
+    if winner == human_p:
+        return -1000 + depth, None
+    if game.filled == len(game.cells):
+        return 0, None
+    if depth >= max_depth:
+        return heuristic(game, ai_p, human_p), None
+
+    if is_max:
+        best = -10**9
+        best_move = None
+        for i in game.free_cells():
+            game.push(i, ai_p)
+            sc, _ = minimax(game, depth+1, max_depth, False, ai_p, human_p, counter)
+            game.pop(i)
+            if sc > best:
+                best = sc
+                best_move = i
+        return best, best_move
+    else:
+        best = 10**9
+        best_move = None
+        for i in game.free_cells():
+            game.push(i, human_p)
+            sc, _ = minimax(game, depth+1, max_depth, True, ai_p, human_p, counter)
+            game.pop(i)
+            if sc < best:
+                best = sc
+                best_move = i
+        return best, best_move
+
+# Profiled twin of minimax for the search-stats panel (search_stats.py): the
+# same search, plus per-ply counts in `stats`. It is a separate function so that
+# minimax itself carries no counting code when the panel is off; keep the two
+# in step.
+def minimax_profiled(game:SearchState, depth, max_depth, is_max, ai_p, human_p, counter, stats):
+    counter[0] += 1
+    if not counter[0] & 1023 and len(counter) > 1 and counter[1].is_set():
+        raise SearchCancelled
+    stats.nodes[depth] += 1
+    winner = game.winner
+    if winner == ai_p:
+        stats.terminals += 1
+        return 1000 - depth, None
+    if winner == human_p:
+        stats.terminals += 1
+        return -1000 + depth, None
+    if game.filled == len(game.cells):
+        stats.terminals += 1
+        return 0, None
+    if depth >= max_depth:
+        stats.leaves += 1
+        return heuristic(game, ai_p, human_p), None
+
+    moves = game.free_cells()
+    stats.interior[depth] += 1
+    stats.children[depth] += len(moves)
+    p = ai_p if is_max else human_p
+    best = -10**9 if is_max else 10**9
+    best_move = None
+    for i in moves:
+        game.push(i, p)
+        sc, _ = minimax_profiled(game, depth+1, max_depth, not is_max, ai_p, human_p, counter, stats)
+        game.pop(i)
+        if (sc > best) if is_max else (sc < best):
+            best = sc
+            best_move = i
+    return best, best_move
+
+def heuristic(game:SearchState, ai_p, human_p):
+    # simple potential-line heuristic: every line still open for a player
+    # scores (stones in it + 1) for that player
+    score = 0
+    for a, h in zip(game.line_counts(ai_p), game.line_counts(human_p)):
+        if not h:
+            score += a + 1
+        if not a:
+            score -= h + 1
+    return score
+
+def choose_move(game:GameState, depth, ai_p, rng=None, counter=_NO_COUNT):
+    # best (r, c) for ai_p, or a random free cell when the search has no preference
+    _, mv = minimax(SearchState.from_game(game), 0, depth, True, ai_p, other(ai_p), counter)
+    if mv is None:
+        moves = game.free_cells()
+        if not moves:
+            return None
+        mv = (rng or position_rng(game)).choice(moves)
+    return divmod(mv, game.size)
+
+# -------------------------
+# Analysis (multi-PV)
+# -------------------------
+# Scores every root move in one search: negamax with alpha-beta below the root
+# and a transposition table keyed by (cells, side to move). Each root move gets
+# a full window so its score is exact, and the table makes the siblings'
+# subtrees (which transpose into each other) cheap. The table lives in an
+# Analysis object, so the analysis of the next position reuses it: an entry
+# searched at least as deep as needed is taken as is (on a fresh table the
+# scores equal minimax at the same depth; a reused table can only add depth),
+# and shallower ones still give the first move to try. Scores are on the
+# minimax scale, for the side to move. The table holds at most `limit` entries;
+# once full, each new entry replaces the oldest one.
+EXACT, LOWER, UPPER = 0, 1, 2
+_INF = 10**9
+
+def _to_table(score, depth):
+    # win/loss scores are stored relative to the node, so they stay valid when
+    # the same position is reached at another depth
+    if score > WIN_SCORE:
+        return score + depth
+    if score < -WIN_SCORE:
+        return score - depth
+    return score
+
+def _from_table(score, depth):
+    if score > WIN_SCORE:
+        return score - depth
+    if score < -WIN_SCORE:
+        return score + depth
+    return score
+
+def negamax(game:SearchState, depth, max_depth, alpha, beta, p, table, counter=_NO_COUNT):
+    counter[0] += 1
+    if not counter[0] & 1023 and len(counter) > 1 and counter[1].is_set():
+        raise SearchCancelled
+    if game.winner:
+        return -1000 + depth  # the previous mover won
+    if game.filled == len(game.cells):
+        return 0
+    q = X + O - p
+    if depth >= max_depth:
+        return heuristic(game, p, q)
+
+    left = max_depth - depth
+    key = (bytes(game.cells), p)
+    entry = table.get(key)
+    first = None
+    if entry is not None:
+        searched, flag, sc, first = entry
+        if searched >= left:
+            sc = _from_table(sc, depth)
+            if flag == EXACT:
+                return sc
+            if flag == LOWER:
+                alpha = max(alpha, sc)
+            else:
+                beta = min(beta, sc)
+            if alpha >= beta:
+                return sc
+
+    alpha0 = alpha
+    best = -_INF
+    best_move = None
+    moves = game.free_cells()
+    if first is not None:
+        # the best move of an earlier visit first: it usually cuts off at once
+        moves.remove(first)
+        moves.insert(0, first)
+    for i in moves:
+        game.push(i, p)
+        sc = -negamax(game, depth+1, max_depth, -beta, -alpha, q, table, counter)
+        game.pop(i)
+        if sc > best:
+            best = sc
+            best_move = i
+            if sc > alpha:
+                alpha = sc
+                if alpha >= beta:
+                    break
+    if entry is None or entry[0] <= left:
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        if len(table) >= table.limit and key not in table:
+            table.popitem(last=False)  # full: the oldest entry makes room
+        table[key] = (left, flag, _to_table(best, depth), best_move)
+    return best
+
+def negamax_profiled(game:SearchState, depth, max_depth, alpha, beta, p, table, counter, stats):
+    # negamax plus per-ply counts, cutoffs and table probes in `stats` (see
+    # minimax_profiled); keep in step with negamax
+    counter[0] += 1
+    if not counter[0] & 1023 and len(counter) > 1 and counter[1].is_set():
+        raise SearchCancelled
+    stats.nodes[depth] += 1
+    if game.winner:
+        stats.terminals += 1
+        return -1000 + depth
+    if game.filled == len(game.cells):
+        stats.terminals += 1
+        return 0
+    q = X + O - p
+    if depth >= max_depth:
+        stats.leaves += 1
+        return heuristic(game, p, q)
+
+    left = max_depth - depth
+    key = (bytes(game.cells), p)
+    entry = table.get(key)
+    stats.tt_probes += 1
+    first = None
+    if entry is not None:
+        searched, flag, sc, first = entry
+        if searched >= left:
+            sc = _from_table(sc, depth)
+            if flag == EXACT:
+                stats.tt_hits += 1
+                return sc
+            if flag == LOWER:
+                alpha = max(alpha, sc)
+            else:
+                beta = min(beta, sc)
+            if alpha >= beta:
+                stats.tt_hits += 1
+                return sc
+
+    alpha0 = alpha
+    best = -_INF
+    best_move = None
+    moves = game.free_cells()
+    if first is not None:
+        moves.remove(first)
+        moves.insert(0, first)
+    stats.interior[depth] += 1
+    for i in moves:
+        stats.children[depth] += 1
+        game.push(i, p)
+        sc = -negamax_profiled(game, depth+1, max_depth, -beta, -alpha, q, table, counter, stats)
+        game.pop(i)
+        if sc > best:
+            best = sc
+            best_move = i
+            if sc > alpha:
+                alpha = sc
+                if alpha >= beta:
+                    stats.cutoffs += 1
+                    break
+    if entry is None or entry[0] <= left:
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        if len(table) >= table.limit and key not in table:
+            table.popitem(last=False)  # full: the oldest entry makes room
+        table[key] = (left, flag, _to_table(best, depth), best_move)
+    return best
+
+class Table(OrderedDict):
+    """Transposition table: (cells, side to move) -> (depth searched, flag,
+    score, best move), in insertion order so the oldest entry goes first."""
+
+    def __init__(self, limit:int):
+        super().__init__()
+        self.limit = limit
+
+class Analysis:
+    """Multi-PV analysis with a transposition table kept between calls. A lock
+    keeps it to one search at a time when worker threads (or sessions) share it."""
+
+    def __init__(self, max_entries:int=1 << 18):
+        self.table = Table(max_entries)
+        self.shape = None
+        self.lock = threading.Lock()
+
+    def _prepare(self, game:GameState):
+        # keys hold only the cells, so the table is only valid for one board shape
+        shape = (game.size, game.win_len)
+        if shape != self.shape:
+            self.table.clear()
+            self.shape = shape
+
+    def scores(self, game:GameState, depth:int, counter=_NO_COUNT, stats=None) -> Dict[int, int]:
+        # exact depth-limited score of every free cell for the side to move;
+        # with `stats` (search_stats.SearchStats) the profiled search runs instead
+        self._prepare(game)
+        state = SearchState.from_game(game)
+        p = state.turn
+        q = other(p)
+        search = negamax if stats is None else partial(negamax_profiled, stats=stats)
+        # iterative deepening: each depth orders the next one through the table
+        for d in range(1, depth + 1):
+            t0 = time.perf_counter()
+            scores = {}
+            moves = state.free_cells()
+            if stats is not None:
+                stats.root(len(moves))
+            for i in moves:
+                state.push(i, p)
+                scores[i] = -search(state, 1, d, -_INF, _INF, q, self.table, counter)
+                state.pop(i)
+            if stats is not None:
+                stats.iteration(d, time.perf_counter() - t0)
+        return scores
+
+    def best_move(self, game:GameState, depth:int, counter=_NO_COUNT, stats=None):
+        # (score, cell) of the best move only: the root window narrows as it goes
+        self._prepare(game)
+        state = SearchState.from_game(game)
+        p = state.turn
+        q = other(p)
+        search = negamax if stats is None else partial(negamax_profiled, stats=stats)
+        moves = state.free_cells()
+        for d in range(1, depth + 1):
+            t0 = time.perf_counter()
+            best, best_move = -_INF, None
+            if stats is not None:
+                stats.root(len(moves))
+            for i in moves:
+                state.push(i, p)
+                sc = -search(state, 1, d, -_INF, -best, q, self.table, counter)
+                state.pop(i)
+                if sc > best:
+                    best, best_move = sc, i
+            # the next depth tries this depth's best move first
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if stats is not None:
+                stats.iteration(d, time.perf_counter() - t0)
+        return best, best_move
+
+ANALYSIS_ENTRIES = 20_000  # entries of each shared table (5-6 MiB when full)
+
+@lru_cache(maxsize=None)
+def shared_analysis(size:int, win_len:int) -> Analysis:
+    # one bounded Analysis per board shape for the whole process: table keys are
+    # (cells, side to move), the same for every session, so all of tic.py's
+    # heatmaps fill and reuse one table instead of one table each
+    return Analysis(max_entries=ANALYSIS_ENTRIES)
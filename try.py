@@ -1,5 +1,7 @@
 # app.py
 import streamlit as st
+from game_state import GameState
+from game_records import record_once
 
 st.set_page_config(page_title="Tic-Tac-Toe (Interactive)", page_icon="🕹️", layout="centered")
 
@@ -55,142 +57,94 @@ st.title("🕹️ Tic-Tac-Toe — Interactive")
 st.write("Play locally. Click a cell to place X or O. Buttons: Undo, New Game, Reset. Winning line highlights.")
 
 # -----------------------
-# Game helpers
+# Session state init
 # -----------------------
-def init_board():
-    return [[None]*3 for _ in range(3)]
+if "game" not in st.session_state:
+    st.session_state.game = GameState(3, 3)
 
-def check_winner(board):
-    # rows
-    for r in range(3):
-        if board[r][0] and board[r][0] == board[r][1] == board[r][2]:
-            return board[r][0], [(r,0),(r,1),(r,2)]
-    # cols
-    for c in range(3):
-        if board[0][c] and board[0][c] == board[1][c] == board[2][c]:
-            return board[0][c], [(0,c),(1,c),(2,c)]
-    # diags
-    if board[0][0] and board[0][0] == board[1][1] == board[2][2]:
-        return board[0][0], [(0,0),(1,1),(2,2)]
-    if board[0][2] and board[0][2] == board[1][1] == board[2][0]:
-        return board[0][2], [(0,2),(1,1),(2,0)]
-    # draw
-    if all(board[r][c] is not None for r in range(3) for c in range(3)):
-        return "Draw", []
-    return None, []
+# partial reruns: a click inside the board only re-renders the board (Streamlit >= 1.37)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
 
 # -----------------------
-# Session state init
+# Callbacks (run before the rerun, so each move renders once)
 # -----------------------
-if "board" not in st.session_state:
-    st.session_state.board = init_board()
-if "turn" not in st.session_state:
-    st.session_state.turn = "X"
-if "history" not in st.session_state:
-    st.session_state.history = []  # list of (player, r, c)
-if "game_over" not in st.session_state:
-    st.session_state.game_over = False
-if "winner" not in st.session_state:
-    st.session_state.winner = None
-if "winning_cells" not in st.session_state:
-    st.session_state.winning_cells = []
+def on_cell(r, c):
+    # game over or occupied cells are ignored by play()
+    st.session_state.game.play(r, c)
+    record_once(st.session_state, st.session_state.game)
+
+def on_undo():
+    if not st.session_state.game.over:
+        st.session_state.game.undo()
+
+def on_new_game():
+    st.session_state.game = GameState(3, 3)
+
+def on_reset():
+    if "game" in st.session_state:
+        del st.session_state["game"]
 
 # -----------------------
 # Controls (top)
 # -----------------------
 col1, col2, col3 = st.columns([1,1,2])
 with col1:
-    if st.button("Undo", key="undo"):
-        if st.session_state.history and not st.session_state.game_over:
-            last = st.session_state.history.pop()
-            _, r, c = last
-            st.session_state.board[r][c] = None
-            st.session_state.turn = "O" if st.session_state.turn == "X" else "X"
+    st.button("Undo", key="undo", on_click=on_undo)
 with col2:
-    if st.button("New Game", key="new"):
-        st.session_state.board = init_board()
-        st.session_state.turn = "X"
-        st.session_state.history = []
-        st.session_state.game_over = False
-        st.session_state.winner = None
-        st.session_state.winning_cells = []
+    st.button("New Game", key="new", on_click=on_new_game)
 with col3:
-    if st.button("Reset All (clear state)", key="reset"):
-        for k in ["board","turn","history","game_over","winner","winning_cells"]:
-            if k in st.session_state:
-                del st.session_state[k]
-        st.experimental_rerun()
+    st.button("Reset All (clear state)", key="reset", on_click=on_reset)
 
-st.write("")  # spacing
-st.markdown(f"**Turn:** {'❌ X' if st.session_state.turn=='X' else '⭕ O'}")
+@fragment
+def board_view():
+    game = st.session_state.game
 
-# -----------------------
-# Board UI (3x3 grid)
-# -----------------------
-rows = [st.columns([1,1,1]) for _ in range(3)]
-# compute filled count to keep unique keys
-filled_count = sum(1 for r in range(3) for c in range(3) if st.session_state.board[r][c] is not None)
-
-for r in range(3):
-    for c in range(3):
-        val = st.session_state.board[r][c]
-        # if this cell is in winning cells, append a star to the aria-label so CSS can style it
-        aria_label = ""
-        label = " "  # single space so aria-label not empty when None
-        if val is None:
-            label = " "
-            aria_label = f"cell_{r}_{c}"
-        else:
-            # winner highlight uses "X★" or "O★" aria-label
-            if (r,c) in st.session_state.winning_cells:
+    st.write("")  # spacing
+    st.markdown(f"**Turn:** {'❌ X' if game.turn_name=='X' else '⭕ O'}")
+
+    # -----------------------
+    # Board UI (3x3 grid)
+    # -----------------------
+    rows = [st.columns([1,1,1]) for _ in range(3)]
+    winning_cells = game.winning_cells
+
+    for r in range(3):
+        for c in range(3):
+            val = game.cell(r, c)
+            # if this cell is in winning cells, append a star to the aria-label so CSS can style it
+            if val is None:
+                label = " "  # single space so aria-label not empty when None
+            elif (r,c) in winning_cells:
+                # winner highlight uses "X★" or "O★" aria-label
                 label = f"{val}★"
-                aria_label = label
-            else:
-                label = val
-                aria_label = val  # "X" or "O"
-        key = f"btn_{r}_{c}_{filled_count}"
-        # Use button and inspect clicks
-        if rows[r][c].button(label, key=key):
-            # If game over or occupied, ignore except allow clicking winning cells (no effect)
-            if st.session_state.game_over:
-                pass
-            elif st.session_state.board[r][c] is not None:
-                pass
             else:
-                # place piece
-                st.session_state.board[r][c] = st.session_state.turn
-                st.session_state.history.append((st.session_state.turn, r, c))
-                winner, win_cells = check_winner(st.session_state.board)
-                if winner is not None:
-                    st.session_state.game_over = True
-                    st.session_state.winner = winner
-                    st.session_state.winning_cells = win_cells
-                else:
-                    st.session_state.turn = "O" if st.session_state.turn == "X" else "X"
-                # immediate re-run to update UI & apply highlight
-                st.experimental_rerun()
-
-# -----------------------
-# Status + History
-# -----------------------
-st.write("")  # spacing
-if st.session_state.game_over:
-    if st.session_state.winner == "Draw":
-        st.info("Result: Draw!")
+                label = val  # "X" or "O"
+            # stable key: the same widget is updated in place from move to move
+            rows[r][c].button(label, key=f"btn_{r}_{c}", on_click=on_cell, args=(r, c))
+
+    # -----------------------
+    # Status + History
+    # -----------------------
+    st.write("")  # spacing
+    if game.over:
+        if not game.winner:
+            st.info("Result: Draw!")
+        else:
+            st.success(f"Winner: {game.winner_name}  {'❌' if game.winner_name=='X' else '⭕'}")
     else:
-        st.success(f"Winner: {st.session_state.winner}  {'❌' if st.session_state.winner=='X' else '⭕'}")
-else:
-    st.info("Game in progress")
-
-st.write("---")
-st.subheader("Move history (latest first)")
-for i, m in enumerate(reversed(st.session_state.history[-9:]), 1):
-    p, r, c = m
-    st.write(f"{i}. Player **{p}** → row {r+1}, col {c+1}")
-
-# accessibility: text board
-st.write("---")
-st.markdown("**Board (rows top → bottom):**")
-for r in range(3):
-    row_display = [st.session_state.board[r][c] if st.session_state.board[r][c] is not None else "." for c in range(3)]
-    st.write(" | ".join(row_display))
+        st.info("Game in progress")
+
+    st.write("---")
+    st.subheader("Move history (latest first)")
+    for i, m in enumerate(reversed(game.history[-9:]), 1):
+        p, r, c = m
+        st.write(f"{i}. Player **{p}** → row {r+1}, col {c+1}")
+
+    # accessibility: text board
+    st.write("---")
+    st.markdown("**Board (rows top → bottom):**")
+    for r in range(3):
+        row_display = [game.cell(r, c) or "." for c in range(3)]
+        st.write(" | ".join(row_display))
+
+board_view()